@@ -6,6 +6,7 @@ app_name = 'authentication'
 urlpatterns = [
     path('register/', views.RegisterView.as_view(), name='register'),
     path('login/', views.login_view, name='login'),
+    path('token/', views.token_login_view, name='token-login'),
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
 ] 
\ No newline at end of file
@@ -23,20 +23,36 @@ class RegisterView(generics.CreateAPIView):
             'message': 'User registered successfully'
         }, status=status.HTTP_201_CREATED)
 
+def token_response(user):
+    token, created = Token.objects.get_or_create(user=user)
+    return Response({
+        'user': UserSerializer(user).data,
+        'token': 'Token ' + token.key,
+        'message': 'Login successful'
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def login_view(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
+        response = token_response(user)
         login(request, user)
-        
-        return Response({
-            'user': UserSerializer(user).data,
-            'token': 'Token ' + token.key,
-            'message': 'Login successful'
-        }, status=status.HTTP_200_OK)
+        return response
+    
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def token_login_view(request):
+    """
+    Login for API clients: returns the token without creating a session
+    (no session row, no cookie, last_login is not updated)
+    """
+    serializer = UserLoginSerializer(data=request.data)
+    if serializer.is_valid():
+        return token_response(serializer.validated_data['user'])
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Concurrency benchmark: gunicorn sync views vs. ASGI async views.
+
+Start both servers against the same database first, e.g.:
+
+    gunicorn vehicle_management.wsgi:application --workers 2 --bind :8000
+    uvicorn vehicle_management.asgi:application --workers 2 --port 8001
+
+then run:
+
+    python benchmark_asgi.py --token <token> --concurrency 50 --requests 1000
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SYNC_URL = "http://localhost:8000/api/v1"
+ASYNC_URL = "http://localhost:8001/api/v1"
+
+# (name, sync path, async path, needs auth)
+ENDPOINTS = [
+    ("vehicle list", "/vehicles/", "/async/vehicles/", False),
+    ("vehicle search", "/vehicles/?search=a", "/async/vehicles/?search=a", False),
+    ("vehicle detail", "/vehicles/{id}/", "/async/vehicles/{id}/", False),
+    ("gallery", "/vehicles/gallery/", "/async/vehicles/gallery/", False),
+    ("stats", "/vehicles/stats/", "/async/vehicles/stats/", True),
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(url, total, concurrency, headers):
+    session = requests.Session()
+    session.headers.update(headers)
+
+    def hit(_):
+        started = time.perf_counter()
+        try:
+            ok = session.get(url, timeout=30).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(hit, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency * 1000 for latency, _ in results]
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync-url", default=SYNC_URL)
+    parser.add_argument("--async-url", default=ASYNC_URL)
+    parser.add_argument("--token", help="API token for authenticated endpoints")
+    parser.add_argument("--vehicle-id", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Token {args.token}"} if args.token else {}
+
+    print(f"🚀 {args.requests} requests per endpoint, {args.concurrency} concurrent clients")
+    print(f"{'endpoint':<16} {'server':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, sync_path, async_path, needs_auth in ENDPOINTS:
+        if needs_auth and not args.token:
+            print(f"{name:<16} skipped (needs --token)")
+            continue
+        for server, base, path in (("sync", args.sync_url, sync_path), ("async", args.async_url, async_path)):
+            url = base + path.format(id=args.vehicle_id)
+            result = run(url, args.requests, args.concurrency, headers)
+            print(f"{name:<16} {server:<6} {result['rps']:>8.1f} {result['p50']:>8.1f} "
+                  f"{result['p95']:>8.1f} {result['p99']:>8.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
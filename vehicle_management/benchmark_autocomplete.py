@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Autocomplete latency benchmark.
+
+Builds the title autocomplete index in-process from synthetic listing
+titles (no database needed), then times suggestions for every prefix of a
+sample of real phrases, from one letter ("t") to full make/model/trim
+phrases, plus prefixes that match nothing. Reports build time, index size
+p50/p99/max lookup latency and the widest range any lookup had to rank, and
+exits non-zero if p99 exceeds --target.
+
+    python benchmark_autocomplete.py
+    python benchmark_autocomplete.py --titles 100000 --queries 50000
+"""
+
+import argparse
+import bisect
+import os
+import random
+import statistics
+import sys
+import time
+
+MAKES = {
+    "Toyota": ["Corolla", "Camry", "Yaris", "RAV4", "Prius", "Aygo", "C-HR", "Land Cruiser", "Hilux", "Auris"],
+    "Ford": ["Fiesta", "Focus", "Kuga", "Puma", "Mondeo", "Ranger", "Transit", "Mustang", "EcoSport", "S-Max"],
+    "Volkswagen": ["Golf", "Polo", "Passat", "Tiguan", "T-Roc", "Up", "Touran", "Arteon", "ID.3", "Sharan"],
+    "BMW": ["1 Series", "3 Series", "5 Series", "X1", "X3", "X5", "i3", "Z4", "M3", "2 Series"],
+    "Mercedes-Benz": ["A-Class", "C-Class", "E-Class", "GLA", "GLC", "S-Class", "CLA", "Sprinter", "Vito", "B-Class"],
+    "Audi": ["A1", "A3", "A4", "A6", "Q2", "Q3", "Q5", "Q7", "TT", "e-tron"],
+    "Nissan": ["Micra", "Qashqai", "Juke", "Leaf", "X-Trail", "Note", "Navara", "Pulsar", "370Z", "Almera"],
+    "Vauxhall": ["Corsa", "Astra", "Insignia", "Mokka", "Crossland", "Grandland", "Zafira", "Adam", "Viva", "Meriva"],
+    "Honda": ["Civic", "Jazz", "CR-V", "HR-V", "Accord", "e", "Insight", "NSX", "Legend", "FR-V"],
+    "Hyundai": ["i10", "i20", "i30", "Tucson", "Kona", "Santa Fe", "Ioniq", "i40", "ix35", "Getz"],
+    "Kia": ["Picanto", "Rio", "Ceed", "Sportage", "Niro", "Sorento", "Stonic", "Soul", "Optima", "Venga"],
+    "Peugeot": ["108", "208", "308", "508", "2008", "3008", "5008", "Partner", "Rifter", "RCZ"],
+    "Renault": ["Clio", "Megane", "Captur", "Kadjar", "Zoe", "Scenic", "Twingo", "Koleos", "Kangoo", "Laguna"],
+    "Skoda": ["Fabia", "Octavia", "Superb", "Kodiaq", "Karoq", "Kamiq", "Scala", "Citigo", "Yeti", "Rapid"],
+    "Tesla": ["Model 3", "Model S", "Model X", "Model Y"],
+}
+TRIMS = ["SE", "GT", "Sport", "Titanium", "Icon", "Design", "Excel", "Premium", "M Sport", "S line", "Zetec", "Active",
+         "Style", "Elite", "Tekna", "Acenta", "Life", "Edition", "Limited", "Trend"]
+ENGINES = ["1.0", "1.2", "1.4", "1.5", "1.6", "1.8", "2.0", "2.2", "2.5", "3.0", "Hybrid", "EV"]
+
+
+def synthetic_titles(count, seed):
+    rng = random.Random(seed)
+    makes = list(MAKES)
+    # A few makes dominate, as on a real marketplace
+    weights = [1 / (rank + 1) for rank in range(len(makes))]
+    for _ in range(count):
+        make = rng.choices(makes, weights)[0]
+        # Dealers write the engine and trim many ways, which widens the phrase table
+        variant = rng.choice([f"{rng.choice(ENGINES)}-{rng.choice(TRIMS)}", rng.choice(TRIMS), rng.choice(ENGINES)])
+        yield f"{make} {rng.choice(MAKES[make])} {variant} {rng.randint(2005, 2025)}"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def queries(index, count, seed):
+    rng = random.Random(seed)
+    phrases = rng.sample(index.keys, min(len(index.keys), count))
+    prefixes = [phrase[:length] for phrase in phrases for length in range(1, len(phrase) + 1)]
+    prefixes += ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz ", k=rng.randint(1, 8))) for _ in range(count // 10)]
+    rng.shuffle(prefixes)
+    return prefixes[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles", type=int, default=1_000_000, help="Synthetic listing titles to index")
+    parser.add_argument("--queries", type=int, default=200_000, help="Lookups to time")
+    parser.add_argument("--limit", type=int, default=10, help="Suggestions per lookup")
+    parser.add_argument("--target", type=float, default=10, help="p99 latency target, ms")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "vehicle_management.settings")
+    import django
+    django.setup()
+    from vehicles.autocomplete import AutocompleteIndex, normalize
+
+    started = time.perf_counter()
+    index = AutocompleteIndex(synthetic_titles(args.titles, args.seed))
+    build = time.perf_counter() - started
+    print(f"🔤 {args.titles:,} titles -> {len(index.keys):,} phrases, "
+          f"{len(index.top):,} precomputed prefixes, built in {build:.1f}s")
+
+    samples = []
+    widest = 0  # Longest range a lookup had to rank
+    for prefix in queries(index, args.queries, args.seed):
+        started = time.perf_counter()
+        index.suggest(prefix, args.limit)
+        samples.append((time.perf_counter() - started) * 1000)
+        prefix = normalize(prefix)
+        if prefix and prefix not in index.top:
+            lo = bisect.bisect_left(index.keys, prefix)
+            widest = max(widest, bisect.bisect_left(index.keys, prefix + "\uffff", lo) - lo)
+
+    p99 = percentile(samples, 99)
+    print(f"{'lookups':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'widest scan':>12}")
+    print(f"{len(samples):>9,} {statistics.median(samples):>8.3f} {p99:>8.3f} {max(samples):>8.3f} {widest:>12,}")
+    if p99 > args.target:
+        print(f"❌ p99 above the {args.target:g} ms target")
+        sys.exit(1)
+    print(f"✅ p99 within the {args.target:g} ms target")
+
+
+if __name__ == "__main__":
+    main()
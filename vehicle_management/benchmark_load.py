@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+"""
+Load generator: concurrent virtual users replaying a realistic request mix.
+
+Each virtual user loops until the run ends: pick an action by weight, send
+it, then pause for a random think time. Browsing actions (list, search,
+detail, gallery, home) are anonymous; create posts a vehicle with 1-3
+JPEGs generated with Pillow and delete_image removes an image from a
+vehicle created earlier in the run, both with an account's token. At the
+end it reports throughput, p50/p95/p99 latency and errors per action.
+
+Every upload is a freshly generated image by default, so the server's
+perceptual-hash duplicate check never skips one; --image-pool N reuses N
+images instead, which measures uploads that are mostly rejected duplicates.
+
+    python benchmark_load.py --users 50 --duration 60
+    python benchmark_load.py --mix list=5,detail=3,create=1 --username admin --password secret
+    python benchmark_load.py --users 200 --think 0 --json results.json
+
+Without --token or --username, --accounts new users are registered for the
+run. Throttling rejects most load-test traffic with 429, so start the server
+with the limits raised, e.g.:
+
+    THROTTLE_ANON_RATE=1000000/min THROTTLE_USER_RATE=1000000/min THROTTLE_EXPENSIVE_RATE=1000000/min \\
+        gunicorn vehicle_management.wsgi:application --workers 4 --bind :8000
+
+Needs httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import httpx
+from PIL import Image, ImageDraw
+
+BASE_URL = "http://localhost:8000/api/v1"
+
+ACTIONS = ("list", "search", "detail", "gallery", "home", "create", "delete_image")
+DEFAULT_MIX = "list=30,search=20,detail=25,gallery=10,home=10,create=3,delete_image=2"
+AUTHENTICATED_ACTIONS = {"create", "delete_image"}
+
+FUEL_TYPES = ["petrol", "diesel", "electric", "hybrid", "hybrid_electric", "gas"]
+TRANSMISSIONS = ["manual", "automatic", "cvt"]
+BODY_TYPES = ["saloon", "hatchback", "suv", "estate", "coupe", "convertible"]
+COLORS = ["Black", "White", "Silver", "Blue", "Red", "Grey"]
+MAKES = ["Toyota", "Ford", "BMW", "Audi", "Honda", "Mercedes", "Nissan", "Tesla"]
+ORDERINGS = ["-created_at", "price", "-price", "-year", "mileage"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r} (choose from {', '.join(ACTIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def synthetic_jpeg(width, height):
+    """
+    A photo-sized JPEG of random shapes, different every call
+    """
+    image = Image.new("RGB", (width, height), tuple(random.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(random.randint(5, 15)):
+        x0, y0 = random.randrange(width), random.randrange(height)
+        box = [x0, y0, x0 + random.randint(20, width // 2), y0 + random.randint(20, height // 2)]
+        fill = tuple(random.randrange(256) for _ in range(3))
+        (draw.ellipse if random.random() < 0.5 else draw.rectangle)(box, fill=fill)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # action -> seconds
+        self.statuses = defaultdict(Counter)  # action -> status code (or exception name) -> count
+        self.errors = Counter()
+
+    def record(self, action, latency, status, ok):
+        self.latencies[action].append(latency)
+        self.statuses[action][status] += 1
+        if not ok:
+            self.errors[action] += 1
+
+    def summary(self, elapsed):
+        rows = {}
+        for action, latencies in sorted(self.latencies.items()):
+            ms = [latency * 1000 for latency in latencies]
+            rows[action] = {
+                "requests": len(ms),
+                "rps": len(ms) / elapsed,
+                "p50": statistics.median(ms),
+                "p95": percentile(ms, 95),
+                "p99": percentile(ms, 99),
+                "max": max(ms),
+                "errors": self.errors[action],
+                "error_rate": self.errors[action] / len(ms),
+                "statuses": {str(status): count for status, count in self.statuses[action].most_common()},
+            }
+        return rows
+
+
+class LoadTest:
+    def __init__(self, args, client, tokens):
+        self.args = args
+        self.client = client
+        self.tokens = tokens
+        self.stats = Stats()
+        self.vehicle_ids = []  # Candidates for detail
+        self.own_images = []  # (vehicle id, image id, token) created by this run
+        self.created = []  # (vehicle id, token)
+        # Empty: generate a new image for every upload
+        self.images = [synthetic_jpeg(*args.image_size) for _ in range(args.image_pool)]
+        self.actions = list(args.mix)
+        self.weights = [args.mix[action] for action in self.actions]
+
+    async def request(self, action, method, path, token=None, ok_statuses=(200,), **kwargs):
+        headers = {"Authorization": f"Token {token}"} if token else {}
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError as error:
+            self.stats.record(action, time.perf_counter() - started, type(error).__name__, False)
+            return None
+        self.stats.record(action, time.perf_counter() - started, response.status_code,
+                          response.status_code in ok_statuses)
+        return response
+
+    # Actions
+
+    async def list(self, user):
+        params = {"page": random.choices([1, 2, 3, 4, 5], [50, 20, 15, 10, 5])[0],
+                  "ordering": random.choice(ORDERINGS)}
+        await self.request("list", "GET", "/vehicles/", params=params)
+
+    async def search(self, user):
+        params = {}
+        if random.random() < 0.6:
+            params["search"] = random.choice(MAKES + COLORS).lower()
+        if random.random() < 0.5:
+            params["fuel_type"] = random.choice(FUEL_TYPES)
+        if random.random() < 0.3:
+            params["transmission"] = random.choice(TRANSMISSIONS)
+        if random.random() < 0.4:
+            low = random.randrange(2000, 40000, 1000)
+            params["min_price"], params["max_price"] = low, low + random.randrange(5000, 30000, 1000)
+        if random.random() < 0.3:
+            params["min_year"] = random.randint(2005, 2020)
+        await self.request("search", "GET", "/vehicles/", params=params or {"search": "a"})
+
+    async def detail(self, user):
+        if not self.vehicle_ids:
+            return await self.list(user)
+        await self.request("detail", "GET", f"/vehicles/{random.choice(self.vehicle_ids)}/")
+
+    async def gallery(self, user):
+        await self.request("gallery", "GET", "/vehicles/gallery/", params={"page": random.randint(1, 3)})
+
+    async def home(self, user):
+        await self.request("home", "GET", "/vehicles/home/")
+
+    async def upload_image(self):
+        if self.images:
+            return random.choice(self.images)
+        # Off the event loop, so encoding does not add to other users' latency
+        return await asyncio.to_thread(synthetic_jpeg, *self.args.image_size)
+
+    async def create(self, user):
+        token = self.tokens[user % len(self.tokens)]
+        make = random.choice(MAKES)
+        year = random.randint(2005, 2024)
+        data = {
+            "title": f"{make} {random.choice(BODY_TYPES).title()} {year}",
+            "year": str(year),
+            "price": str(random.randrange(2000, 60000, 100)),
+            "fuel_type": random.choice(FUEL_TYPES),
+            "transmission": random.choice(TRANSMISSIONS),
+            "mileage": f"{random.randrange(1000, 150000, 1000):,} miles",
+            "body_type": random.choice(BODY_TYPES),
+            "color": random.choice(COLORS),
+            "engine": f"{random.choice(['1.2', '1.6', '2.0', '3.0'])}L",
+            "description": "Created by benchmark_load.py",
+            "features": json.dumps(random.sample(["Navigation", "Heated Seats", "Sunroof", "Bluetooth"], 2)),
+        }
+        files = [
+            ("uploaded_images", (f"load_{i}.jpg", await self.upload_image(), "image/jpeg"))
+            for i in range(random.randint(1, 3))
+        ]
+        response = await self.request("create", "POST", "/vehicles/", token=token, ok_statuses=(201,),
+                                      data=data, files=files)
+        if response is not None and response.status_code == 201:
+            vehicle = response.json()
+            self.vehicle_ids.append(vehicle["id"])
+            self.created.append((vehicle["id"], token))
+            self.own_images.extend((vehicle["id"], image["id"], token) for image in vehicle.get("images", []))
+
+    async def delete_image(self, user):
+        if not self.own_images:
+            return await self.create(user)
+        vehicle_id, image_id, token = self.own_images.pop(random.randrange(len(self.own_images)))
+        await self.request("delete_image", "DELETE", f"/vehicles/{vehicle_id}/images/{image_id}/delete/",
+                           token=token, ok_statuses=(204,))
+
+    # Run
+
+    async def virtual_user(self, user, deadline):
+        # Spread the start over the ramp-up so users don't arrive in lockstep
+        await asyncio.sleep(self.args.ramp_up * user / max(self.args.users, 1))
+        while time.perf_counter() < deadline:
+            action = random.choices(self.actions, self.weights)[0]
+            await getattr(self, action)(user)
+            if self.args.think:
+                await asyncio.sleep(random.expovariate(1000 / self.args.think))
+
+    async def run(self):
+        for page in range(1, 6):
+            response = await self.client.get("/vehicles/", params={"page": page})
+            if response.status_code != 200:
+                break
+            self.vehicle_ids.extend(vehicle["id"] for vehicle in response.json()["results"])
+        started = time.perf_counter()
+        deadline = started + self.args.duration
+        await asyncio.gather(*(self.virtual_user(user, deadline) for user in range(self.args.users)))
+        return time.perf_counter() - started
+
+    async def cleanup(self):
+        for vehicle_id, token in self.created:
+            await self.client.delete(f"/vehicles/{vehicle_id}/", headers={"Authorization": f"Token {token}"})
+
+
+async def get_tokens(client, args):
+    if args.token:
+        return [args.token.removeprefix("Token ").strip()]
+    if args.username:
+        response = await client.post("/auth/token/", json={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        return [response.json()["token"].removeprefix("Token ")]
+    tokens = []
+    for _ in range(args.accounts):
+        name = f"loadtest_{uuid.uuid4().hex[:10]}"
+        password = uuid.uuid4().hex
+        response = await client.post("/auth/register/", json={
+            "username": name, "email": f"{name}@example.com", "password": password,
+            "password_confirm": password, "first_name": "Load", "last_name": "Test",
+        })
+        if response.status_code != 201:
+            raise SystemExit(f"❌ Registering {name} failed: {response.status_code} {response.text[:200]}")
+        tokens.append(response.json()["token"])
+    return tokens
+
+
+def upload_mode(args):
+    if not args.image_pool:
+        return "a new image per upload (none skipped as duplicates)"
+    return (f"images reused from a pool of {args.image_pool} "
+            "(repeats are skipped by the server's duplicate check)")
+
+
+def print_report(rows, elapsed):
+    total = sum(row["requests"] for row in rows.values())
+    errors = sum(row["errors"] for row in rows.values())
+    print(f"\n📊 {total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s, "
+          f"{errors} errors ({errors / max(total, 1):.1%})\n")
+    print(f"{'action':<14} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'errors':>7} {'err %':>6}  statuses")
+    for action, row in rows.items():
+        statuses = " ".join(f"{status}×{count}" for status, count in row["statuses"].items())
+        print(f"{action:<14} {row['requests']:>8} {row['rps']:>8.1f} {row['p50']:>8.1f} {row['p95']:>8.1f} "
+              f"{row['p99']:>8.1f} {row['max']:>8.1f} {row['errors']:>7} {row['error_rate']:>6.1%}  {statuses}")
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        needs_auth = any(action in AUTHENTICATED_ACTIONS for action in args.mix)
+        tokens = await get_tokens(client, args) if needs_auth else []
+        test = LoadTest(args, client, tokens)
+        print(f"🚀 {args.users} virtual users for {args.duration}s against {args.base_url}")
+        print(f"   mix: {', '.join(f'{action}={weight:g}' for action, weight in args.mix.items())}")
+        if "create" in args.mix:
+            print(f"   uploads: {upload_mode(args)}")
+        elapsed = await test.run()
+        rows = test.stats.summary(elapsed)
+        print_report(rows, elapsed)
+        if "create" in args.mix:
+            print(f"\n   create uploaded {upload_mode(args)}")
+        if args.json:
+            with open(args.json, "w") as output:
+                json.dump({"users": args.users, "duration": elapsed, "mix": args.mix, "image_pool": args.image_pool,
+                           "actions": rows}, output, indent=2)
+            print(f"\n💾 Results written to {args.json}")
+        if args.cleanup and test.created:
+            await test.cleanup()
+            print(f"🧹 Deleted {len(test.created)} vehicles created during the run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Seconds over which users start")
+    parser.add_argument("--think", type=float, default=500, help="Mean think time between requests, ms (0 for none)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Action weights (default {DEFAULT_MIX})")
+    parser.add_argument("--token", help="API token for create/delete_image")
+    parser.add_argument("--username", help="Log in as this user for create/delete_image")
+    parser.add_argument("--password")
+    parser.add_argument("--accounts", type=int, default=1, help="Users to register when no credentials are given")
+    parser.add_argument("--image-size", type=lambda text: tuple(int(n) for n in text.split("x")), default=(800, 600),
+                        help="Generated image size, WIDTHxHEIGHT")
+    parser.add_argument("--image-pool", type=int, default=0,
+                        help="Reuse this many pre-generated images (default 0: a new image per upload)")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout, seconds")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--cleanup", action="store_true", help="Soft delete the vehicles created during the run")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
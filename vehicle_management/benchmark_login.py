@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Login latency benchmark.
+
+Compares the session login (/auth/login/) with the token-only login
+(/auth/token/) against a running server, e.g.:
+
+    python benchmark_login.py --username alice --password secret --requests 200
+
+To compare hashers, run it once against a server started with
+PASSWORD_HASHER=pbkdf2 and once with PASSWORD_HASHER=argon2. The first
+argon2 login upgrades the stored hash, so warm up before measuring (the
+script sends --warmup logins first). --hashers times a password check for
+each hasher in-process, without a server.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = "http://localhost:8000/api/v1"
+
+ENDPOINTS = [
+    ("session login", "/auth/login/"),
+    ("token login", "/auth/token/"),
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(url, credentials, total, concurrency):
+    def hit(_):
+        # A fresh session per request so no cookie carries over between logins
+        started = time.perf_counter()
+        try:
+            ok = requests.post(url, json=credentials, timeout=30).status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(hit, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency * 1000 for latency, _ in results]
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "errors": sum(1 for _, ok in results if not ok),
+    }
+
+
+def time_hashers(rounds):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "vehicle_management.settings")
+    import django
+    django.setup()
+    from django.contrib.auth.hashers import get_hashers
+
+    print(f"{'hasher':<28} {'check ms':>9}")
+    for hasher in get_hashers():
+        try:
+            encoded = hasher.encode("benchmark-password", hasher.salt())
+        except ValueError:
+            print(f"{hasher.algorithm:<28} {'not installed':>9}")
+            continue
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            hasher.verify("benchmark-password", encoded)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f"{hasher.algorithm:<28} {statistics.median(samples):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--hashers", action="store_true", help="Time each password hasher in-process instead")
+    args = parser.parse_args()
+
+    if args.hashers:
+        time_hashers(max(1, args.warmup))
+        return
+    if not (args.username and args.password):
+        parser.error("--username and --password are required")
+
+    credentials = {"username": args.username, "password": args.password}
+    for _ in range(args.warmup):
+        requests.post(args.url + ENDPOINTS[0][1], json=credentials, timeout=30)
+
+    print(f"🔐 {args.requests} logins per endpoint, {args.concurrency} concurrent clients")
+    print(f"{'endpoint':<14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, path in ENDPOINTS:
+        result = run(args.url + path, credentials, args.requests, args.concurrency)
+        print(f"{name:<14} {result['rps']:>8.1f} {result['p50']:>8.1f} "
+              f"{result['p95']:>8.1f} {result['p99']:>8.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
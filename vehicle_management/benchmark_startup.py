@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Cold start benchmark: time from launching the server to its first response.
+
+Starts the server several times, polls a URL until it answers, and reports
+time-to-first-response. With --importtime it also lists the slowest imports
+of a bare django.setup().
+
+    python benchmark_startup.py --runs 5
+    python benchmark_startup.py --command "python manage.py runserver 127.0.0.1:8010 --noreload"
+    python benchmark_startup.py --importtime
+"""
+
+import argparse
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PORT = 8010
+DEFAULT_COMMAND = f"gunicorn vehicle_management.wsgi:application --bind 127.0.0.1:{PORT}"
+DEFAULT_URL = f"http://127.0.0.1:{PORT}/api/v1/vehicles/"
+
+
+def time_to_first_response(command, url, timeout):
+    started = time.perf_counter()
+    server = subprocess.Popen(shlex.split(command), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    response.read()
+                return time.perf_counter() - started
+            except urllib.error.HTTPError:
+                # Any HTTP answer means the app is serving
+                return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"No response from {url} within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def slowest_imports(limit):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="vehicle_management.settings")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import django; django.setup()"],
+        env=env, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    rows.sort(reverse=True)
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative_us, self_us, module in rows[:limit]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--command", default=DEFAULT_COMMAND, help="Server start command")
+    parser.add_argument("--url", default=DEFAULT_URL, help="URL polled for the first response")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--importtime", action="store_true", help="List the slowest imports instead")
+    parser.add_argument("--limit", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.importtime:
+        slowest_imports(args.limit)
+        return
+
+    print(f"🚀 {args.command}")
+    samples = []
+    for run in range(1, args.runs + 1):
+        elapsed = time_to_first_response(args.command, args.url, args.timeout)
+        samples.append(elapsed * 1000)
+        print(f"   run {run}: {elapsed * 1000:.0f} ms to first response")
+
+    print(f"\nTime to first response: median {statistics.median(samples):.0f} ms, "
+          f"min {min(samples):.0f} ms, max {max(samples):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for vehicle_management project.
+
+Gunicorn loads this file automatically when started from this directory:
+
+    gunicorn vehicle_management.wsgi:application
+
+The app is imported and its in-memory indexes are built once in the master
+(preload_app, when_ready), then shared with the workers copy-on-write. Each
+worker only opens its database connections before taking traffic, so the
+first request after a scale-up doesn't pay for them.
+"""
+
+import os
+
+from vehicle_management.db import gunicorn_thread_count, gunicorn_worker_count
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# The same counts size each worker's database pool (vehicle_management/db.py)
+workers = gunicorn_worker_count()
+threads = gunicorn_thread_count()
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+preload_app = True
+
+
+def when_ready(server):
+    from vehicle_management.warmup import warm_app
+
+    warm_app()
+
+
+def post_fork(server, worker):
+    from vehicle_management.warmup import warm_worker
+
+    warm_worker()
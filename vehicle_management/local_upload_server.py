@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Local stand-in for Cloudinary's signed upload API.
+
+Lets the direct upload flow (/vehicles/{id}/images/upload/,
+/vehicles/gallery/upload/, /vehicles/uploads/confirm/) run without a
+Cloudinary account. It checks the request signature and timestamp the way
+Cloudinary does, stores the file under --root as <public_id>.<format> (the
+layout LocalAssetStorage reads) and answers with a response signed with the
+same API secret, e.g.:
+
+    python local_upload_server.py --port 8001
+    DIRECT_UPLOAD_URL=http://127.0.0.1:8001/image/upload python manage.py runserver
+
+Both processes must see the same CLOUDINARY_API_KEY / CLOUDINARY_API_SECRET.
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from cloudinary.utils import api_sign_request
+from PIL import Image
+
+# Cloudinary rejects signatures older than this
+MAX_SIGNATURE_AGE = 3600
+# Sent with the upload but not part of the signature
+UNSIGNED_FIELDS = {'file', 'api_key', 'signature', 'resource_type', 'cloud_name'}
+
+
+def parse_multipart(content_type, body):
+    message = BytesParser(policy=default_policy).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode() + body
+    )
+    fields, file = {}, None
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if name == 'file':
+            file = part.get_payload(decode=True)
+        else:
+            fields[name] = part.get_content().strip()
+    return fields, file
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    api_key = None
+    api_secret = None
+    root = None
+
+    def respond(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def error(self, status, message):
+        self.respond(status, {'error': {'message': message}})
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST')
+        self.send_header('Access-Control-Allow-Headers', '*')
+        self.end_headers()
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/image/upload'):
+            return self.error(404, 'Unknown endpoint')
+        length = int(self.headers.get('Content-Length', 0))
+        fields, file = parse_multipart(self.headers.get('Content-Type', ''), self.rfile.read(length))
+
+        if fields.get('api_key') != self.api_key:
+            return self.error(401, 'Invalid api_key')
+        signed = {key: value for key, value in fields.items() if key not in UNSIGNED_FIELDS}
+        if fields.get('signature') != api_sign_request(signed, self.api_secret):
+            return self.error(401, 'Invalid Signature')
+        if abs(time.time() - int(fields.get('timestamp', 0))) > MAX_SIGNATURE_AGE:
+            return self.error(400, 'Stale request')
+        if not file:
+            return self.error(400, 'Missing required parameter - file')
+
+        try:
+            with Image.open(io.BytesIO(file)) as image:
+                width, height = image.size
+                image_format = {'jpeg': 'jpg'}.get(image.format.lower(), image.format.lower())
+        except Exception:
+            return self.error(400, 'Invalid image file')
+        allowed = fields.get('allowed_formats')
+        if allowed and image_format not in allowed.split(','):
+            return self.error(400, f'Image format {image_format} not allowed')
+
+        public_id = fields.get('public_id') or os.urandom(10).hex()
+        path = self.root / f'{public_id}.{image_format}'
+        if self.root.resolve() not in path.resolve().parents:
+            return self.error(400, 'Invalid public_id')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(file)
+
+        version = int(time.time())
+        self.respond(200, {
+            'public_id': public_id,
+            'version': version,
+            'signature': api_sign_request({'public_id': public_id, 'version': version}, self.api_secret,
+                                          signature_version=1),
+            'width': width,
+            'height': height,
+            'format': image_format,
+            'resource_type': 'image',
+            'type': 'upload',
+            'bytes': len(file),
+            'url': path.resolve().as_uri(),
+        })
+
+    def log_message(self, format, *args):
+        print(f"📥 {self.address_string()} {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--root', default=os.environ.get('ASSET_STORAGE_LOCAL_ROOT',
+                                                      os.path.join(tempfile.gettempdir(), 'vehicle_assets')),
+                        help='Directory uploaded files are stored under')
+    parser.add_argument('--api-key', default=os.environ.get('CLOUDINARY_API_KEY', ''))
+    parser.add_argument('--api-secret', default=os.environ.get('CLOUDINARY_API_SECRET', ''))
+    args = parser.parse_args()
+
+    if not args.api_secret:
+        parser.error('set CLOUDINARY_API_SECRET or pass --api-secret')
+    UploadHandler.api_key = args.api_key
+    UploadHandler.api_secret = args.api_secret
+    UploadHandler.root = Path(args.root)
+
+    server = ThreadingHTTPServer((args.host, args.port), UploadHandler)
+    print(f"🚀 Local upload server on http://{args.host}:{args.port}/image/upload, storing in {args.root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == '__main__':
+    main()
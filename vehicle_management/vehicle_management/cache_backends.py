@@ -0,0 +1,437 @@
+"""
+Cache backends for vehicle_management project.
+
+SQLiteCache is a host-local cache shared by every gunicorn worker through
+one SQLite file (in /dev/shm when available, so it never touches disk). A
+get or set is a single indexed statement on a per-thread connection, unlike
+FileBasedCache, which lists its whole directory on every set. Expired rows
+are pruned on roughly one set in CULL_EVERY.
+
+TwoTierCache puts a per-process LRU (L1) in front of a cache every worker
+and node shares (L2, LOCATION names its alias in CACHES):
+
+- reads are served from L1 when possible, otherwise from L2, and kept in L1
+  for at most L1_TIMEOUT seconds, and never past the L2 entry's expiry (L2
+  stores each value with its expiry time);
+- writes go to L2 and are appended to an invalidation log kept in L2 itself,
+  which each process reads at most every INVALIDATION_POLL seconds to drop
+  the L1 entries other processes changed. Any backend with an atomic add()
+  (SQLiteCache, Redis, Memcached) works as L2;
+- get_or_set() is single-flight: concurrent misses for a key in one process
+  wait for one computation, and other processes wait on a lock in L2.
+
+namespaced_key() and invalidate_namespace() version a group of keys so it
+can be invalidated at once on any backend. database_key() is a KEY_FUNCTION
+that keeps each database's entries apart in a cache they share.
+"""
+
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache as default_cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connection
+from django.utils.text import slugify
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self.cull_every = params.get('OPTIONS', {}).get('CULL_EVERY', 1000)
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        local = self._local
+        # A connection must not cross a fork (gunicorn preloads the app)
+        if getattr(local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)'
+            )
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _expiry(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return float('inf') if timeout is None else timeout
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection.execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, self.pickle_protocol), self._expiry(timeout)),
+        )
+        if random.randrange(self.cull_every) == 0:
+            self._cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, time.time()))
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, self.pickle_protocol), self._expiry(timeout)),
+            )
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND expires > ?',
+            (self._expiry(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone() is not None
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def _cull(self):
+        connection = self._connection
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        # Past MAX_ENTRIES, drop the entries closest to expiring
+        excess = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self._max_entries
+        if excess > 0:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT ?)', (excess,)
+            )
+
+    def close(self, **kwargs):
+        # Connections are reused across requests for the life of the thread
+        pass
+
+
+_MISSING = object()
+
+# Keys TwoTierCache keeps in L2 for itself
+LOG_HEAD_KEY = ':invalidation:head'
+LOG_ENTRY_KEY = ':invalidation:%d'
+FLIGHT_KEY = ':flight:%s'
+CLEAR_ALL = '*'
+# Log entries read per L2 round trip while catching up
+LOG_BATCH = 16
+
+
+class _Local:
+    """
+    L1 state shared by every thread's TwoTierCache instance in a process
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.token = uuid.uuid4().hex  # Tells this process's log entries apart
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires, pickled value), least recently used first
+        self.flights = {}  # key -> Event set when its computation finishes
+        self.seen = None  # Last invalidation log entry applied
+        self.polled_at = 0.0
+
+
+_locals = {}
+_locals_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = location
+        self.l1_timeout = options.get('L1_TIMEOUT', 60)
+        self.poll_interval = options.get('INVALIDATION_POLL', 0.25)
+        self.log_timeout = options.get('INVALIDATION_LOG_TIMEOUT', 300)
+        self.flight_timeout = options.get('FLIGHT_TIMEOUT', 30)
+        self.flight_poll = options.get('FLIGHT_POLL', 0.05)
+
+    @property
+    def _l2(self):
+        return caches[self.l2_alias]
+
+    @property
+    def _local(self):
+        local = _locals.get(self.l2_alias)
+        # Locks and in-flight computations must not cross a fork
+        if local is None or local.pid != os.getpid():
+            with _locals_lock:
+                local = _locals.get(self.l2_alias)
+                if local is None or local.pid != os.getpid():
+                    local = _locals[self.l2_alias] = _Local()
+        return local
+
+    # L1
+
+    def _l1_get(self, key):
+        local = self._local
+        with local.lock:
+            entry = local.entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] <= time.monotonic():
+                del local.entries[key]
+                return _MISSING
+            local.entries.move_to_end(key)
+        return pickle.loads(entry[1])
+
+    def _l1_set(self, key, value, expires):
+        # expires is the entry's absolute expiry time, None if it never expires
+        timeout = self.l1_timeout if expires is None else min(expires - time.time(), self.l1_timeout)
+        if timeout <= 0:
+            self._l1_drop([key])
+            return
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        local = self._local
+        with local.lock:
+            local.entries[key] = (time.monotonic() + timeout, pickled)
+            local.entries.move_to_end(key)
+            while len(local.entries) > self._max_entries:
+                local.entries.popitem(last=False)
+
+    def _l1_drop(self, keys):
+        local = self._local
+        with local.lock:
+            if CLEAR_ALL in keys:
+                local.entries.clear()
+            for key in keys:
+                local.entries.pop(key, None)
+
+    # Invalidation log
+
+    def _poll(self, force=False):
+        """
+        Drop the L1 entries other processes have changed since the last poll
+        """
+        local = self._local
+        now = time.monotonic()
+        if not force and now - local.polled_at < self.poll_interval:
+            return
+        local.polled_at = now
+        l2 = self._l2
+        if local.seen is None:
+            # Nothing in a new process's L1 can be stale yet
+            local.seen = l2.get(LOG_HEAD_KEY, 0)
+            return
+        while True:
+            sequences = range(local.seen + 1, local.seen + 1 + LOG_BATCH)
+            found = l2.get_many([LOG_HEAD_KEY] + [LOG_ENTRY_KEY % seq for seq in sequences])
+            for seq in sequences:
+                entry = found.get(LOG_ENTRY_KEY % seq)
+                if entry is None:
+                    break
+                token, keys = entry
+                if token != local.token:
+                    self._l1_drop(keys)
+                local.seen = seq
+            else:
+                continue
+            # The head is read first, so every entry up to it existed: a
+            # missing one expired before this process read it
+            head = found.get(LOG_HEAD_KEY, 0)
+            if head > local.seen:
+                self._l1_drop([CLEAR_ALL])
+                local.seen = head
+            return
+
+    def _broadcast(self, keys):
+        local = self._local
+        if local.seen is None:
+            self._poll(force=True)
+        l2 = self._l2
+        seq = max(l2.get(LOG_HEAD_KEY, 0), local.seen) + 1
+        # add() claims a sequence number atomically; concurrent writers move on to the next
+        while not l2.add(LOG_ENTRY_KEY % seq, (local.token, keys), self.log_timeout):
+            seq += 1
+        l2.set(LOG_HEAD_KEY, seq, None)
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._poll()
+        value = self._l1_get(key)
+        if value is _MISSING:
+            value = self._l2_get(key)
+            if value is _MISSING:
+                return default
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._set(key, value, timeout)
+
+    def _set(self, key, value, timeout):
+        expires = self.get_backend_timeout(timeout)
+        self._l2.set(key, (expires, value), self._l2_timeout(timeout))
+        self._l1_set(key, value, expires)
+        self._broadcast([key])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        if not self._l2.add(key, (expires, value), self._l2_timeout(timeout)):
+            return False
+        self._l1_set(key, value, expires)
+        self._broadcast([key])
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        # The expiry stored with the value is left as it was, so L1 copies
+        # made later expire no later than before: sooner, never staler
+        key = self.make_and_validate_key(key, version=version)
+        return self._l2.touch(key, self._l2_timeout(timeout))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        deleted = self._l2.delete(key)
+        self._l1_drop([key])
+        self._broadcast([key])
+        return deleted
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self._l2.clear()
+        self._l1_drop([CLEAR_ALL])
+        self._broadcast([CLEAR_ALL])
+
+    def _l2_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _l2_get(self, key):
+        """
+        key's value from L2, copied into L1 for no longer than L2 keeps it
+        """
+        entry = self._l2.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        self._l1_set(key, value, expires)
+        return value
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Like BaseCache.get_or_set(), but concurrent misses for the same key
+        share one computation of default
+        """
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        key = self.make_and_validate_key(key, version=version)
+        local = self._local
+        with local.lock:
+            flight = local.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = local.flights[key] = threading.Event()
+        if not leader:
+            # Another thread here is computing it
+            flight.wait(self.flight_timeout)
+            value = self._l1_get(key)
+            if value is _MISSING:
+                value = self._l2_get(key)
+            if value is not _MISSING:
+                return value
+            return self._compute(key, default, timeout)
+        try:
+            return self._fill(key, default, timeout)
+        finally:
+            with local.lock:
+                local.flights.pop(key, None)
+            flight.set()
+
+    def _fill(self, key, default, timeout):
+        l2 = self._l2
+        lock = FLIGHT_KEY % key
+        if l2.add(lock, self._local.token, self.flight_timeout):
+            try:
+                return self._compute(key, default, timeout)
+            finally:
+                l2.delete(lock)
+        # Another process is computing it: wait for its result
+        deadline = time.monotonic() + self.flight_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.flight_poll)
+            value = self._l2_get(key)
+            if value is not _MISSING:
+                return value
+            if not l2.has_key(lock):
+                break  # It finished without storing anything, or failed
+        return self._compute(key, default, timeout)
+
+    def _compute(self, key, default, timeout):
+        value = default() if callable(default) else default
+        self._set(key, value, timeout)
+        return value
+
+    def close(self, **kwargs):
+        # L1 lives for the life of the process and L2 closes itself
+        pass
+
+
+def namespaced_key(namespace, key, cache=None):
+    """
+    key within namespace's current version; invalidate_namespace() moves
+    every key of the namespace to a new version at once
+    """
+    cache = cache or default_cache
+    version_key = f'namespace:{namespace}'
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex[:12], None)
+        version = cache.get(version_key)
+    return f'{namespace}:{version}:{key}'
+
+
+def invalidate_namespace(namespace, cache=None):
+    """
+    Make every key of namespace unreachable; the old entries expire on their own
+    """
+    (cache or default_cache).set(f'namespace:{namespace}', uuid.uuid4().hex[:12], None)
+
+
+_database_prefixes = {}
+
+
+def database_key(key, key_prefix, version):
+    """
+    KEY_FUNCTION that prefixes keys with the default database's name, so a
+    cache shared by several databases (a test run next to the dev server,
+    two checkouts on one host) never serves one's entries to another
+    """
+    name = connection.settings_dict['NAME']
+    prefix = _database_prefixes.get(name)
+    if prefix is None:
+        prefix = _database_prefixes[name] = slugify(str(name))
+    return f'{prefix}:{key_prefix}:{version}:{key}'
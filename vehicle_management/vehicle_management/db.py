@@ -0,0 +1,136 @@
+"""
+Database connection helpers for vehicle_management project.
+
+Sizes the psycopg connection pool for each gunicorn worker and exposes
+pool health metrics for the /api/v1/health/db/ endpoint.
+"""
+
+import logging
+import time
+
+from decouple import config
+
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_ENGINE = 'django.db.backends.postgresql'
+
+# gunicorn.conf.py reads the same defaults, so the pools are sized for the
+# workers and threads gunicorn actually starts
+DEFAULT_WORKERS = 2
+DEFAULT_THREADS = 1
+
+
+def gunicorn_worker_count():
+    """
+    Number of gunicorn worker processes sharing the database (WEB_CONCURRENCY)
+    """
+    return max(1, config('WEB_CONCURRENCY', default=DEFAULT_WORKERS, cast=int))
+
+
+def gunicorn_thread_count():
+    """
+    Number of request threads in each gunicorn worker (GUNICORN_THREADS)
+    """
+    return max(1, config('GUNICORN_THREADS', default=DEFAULT_THREADS, cast=int))
+
+
+def pool_size_per_worker():
+    """
+    Split the database connection budget evenly across gunicorn workers.
+
+    A few connections are held back for migrations, `manage.py shell` and
+    one-off jobs so a fully loaded web tier can't lock them out. Each worker
+    gets at least one connection per thread, even if that exceeds the
+    budget, so its threads never queue for a connection.
+    """
+    max_connections = config('DB_MAX_CONNECTIONS', default=20, cast=int)
+    reserved = config('DB_RESERVED_CONNECTIONS', default=3, cast=int)
+    share = (max_connections - reserved) // gunicorn_worker_count()
+    return max(gunicorn_thread_count(), share)
+
+
+def configure_connection_reuse(database):
+    """
+    Add connection reuse settings to a DATABASES entry.
+
+    PostgreSQL gets a per-worker psycopg pool with health checks on checkout.
+    Other engines (SQLite for local development) keep persistent connections
+    via CONN_MAX_AGE instead.
+    """
+    database.setdefault('OPTIONS', {})
+    database['CONN_HEALTH_CHECKS'] = True
+
+    if database['ENGINE'] != POSTGRES_ENGINE or not config('DB_POOL', default=True, cast=bool):
+        database['CONN_MAX_AGE'] = config('CONN_MAX_AGE', default=60, cast=int)
+        return database
+
+    if config('DB_PGBOUNCER', default=False, cast=bool):
+        # PgBouncer transaction mode hands the server connection to another
+        # client after each transaction, so named cursors can't outlive it.
+        # Prepared statements are already disabled by Django for psycopg 3.
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+    max_size = pool_size_per_worker()
+    database['CONN_MAX_AGE'] = 0  # Pooling replaces persistent connections
+    database['OPTIONS']['pool'] = {
+        'min_size': min(config('DB_POOL_MIN_SIZE', default=1, cast=int), max_size),
+        'max_size': max_size,
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+    }
+    return database
+
+
+def pool_metrics(alias='default'):
+    """
+    Return pool wait time and saturation metrics for a database alias
+    """
+    from django.db import connections
+
+    pool = getattr(connections[alias], 'pool', None)
+    if pool is None:
+        return {'pooled': False}
+
+    stats = pool.get_stats()
+    pool_max = stats.get('pool_max', 0)
+    in_use = stats.get('pool_size', 0) - stats.get('pool_available', 0)
+    queued = stats.get('requests_queued', 0)
+    return {
+        'pooled': True,
+        'pool_min': stats.get('pool_min', 0),
+        'pool_max': pool_max,
+        'pool_size': stats.get('pool_size', 0),
+        'in_use': in_use,
+        'available': stats.get('pool_available', 0),
+        'saturation': round(in_use / pool_max, 3) if pool_max else 0.0,
+        'requests_total': stats.get('requests_num', 0),
+        'requests_waiting': stats.get('requests_waiting', 0),
+        'requests_queued': queued,
+        'requests_errors': stats.get('requests_errors', 0),
+        'wait_ms_total': stats.get('requests_wait_ms', 0),
+        'wait_ms_avg': round(stats.get('requests_wait_ms', 0) / queued, 2) if queued else 0.0,
+        'connections_lost': stats.get('connections_lost', 0),
+    }
+
+
+def check_database(alias='default'):
+    """
+    Run a trivial query and report how long it took. Failures are logged,
+    not returned: the result is served to anonymous clients
+    """
+    from django.db import connections
+
+    started = time.perf_counter()
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except Exception:
+        logger.exception('Database health check failed for %r', alias)
+        return {'healthy': False}
+    return {
+        'healthy': True,
+        'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,123 @@
+"""
+Read-replica routing for vehicle_management project.
+
+Safe-method requests to the vehicles API read from a replica listed in
+settings.REPLICA_DATABASES. Anything else, including every write, goes to
+`default`. After a client's write to the vehicles API succeeds, it is
+pinned to the primary for settings.REPLICA_PIN_SECONDS so it always sees
+its own changes.
+"""
+
+import contextvars
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+PIN_COOKIE = 'primary_pin'
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to a random replica while a request has enabled it
+    """
+
+    def db_for_read(self, model, **hints):
+        # Token lookups stay on the primary so a freshly issued token works at once
+        if model._meta.app_label == 'authtoken':
+            return 'default'
+        if _use_replica.get() and settings.REPLICA_DATABASES:
+            return random.choice(settings.REPLICA_DATABASES)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects from any of them may relate
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def _client_identity(request):
+    """
+    Identify the client without touching the database (token or session)
+    """
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode()).hexdigest()
+
+
+def _pin_key(identity):
+    return f'replicas:primary-pin:{identity}'
+
+
+def is_pinned_to_primary(request):
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    identity = _client_identity(request)
+    return identity is not None and cache.get(_pin_key(identity)) is not None
+
+
+def pin_to_primary(request, response):
+    """
+    Keep the client on the primary until replicas have caught up with its write
+    """
+    window = settings.REPLICA_PIN_SECONDS
+    identity = _client_identity(request)
+    if identity is not None:
+        cache.set(_pin_key(identity), 1, timeout=window)
+    # The cookie covers browsers whose next request lands on another worker
+    response.set_cookie(PIN_COOKIE, '1', max_age=window, httponly=True, samesite='Lax')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Enable replica reads for safe requests to the vehicles API
+    """
+    namespaces = {'vehicles', 'vehicles_async'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            # Not reset(token): under ASGI, process_view runs in a copy of this
+            # context, whose tokens can't be reset here. asgiref copies the
+            # flag back out, so setting it clears it for this request
+            _use_replica.set(False)
+
+        # Rejected writes and logins change nothing a replica could lag behind on
+        if (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and 200 <= response.status_code < 300
+            and self._in_vehicles_api(request)
+        ):
+            pin_to_primary(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Only the vehicles API opts in; admin and auth views always use the primary
+        if not settings.REPLICA_DATABASES or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        if not self._in_vehicles_api(request):
+            return None
+        if not is_pinned_to_primary(request):
+            _use_replica.set(True)
+        return None
+
+    def _in_vehicles_api(self, request):
+        match = request.resolver_match
+        return match is not None and bool(self.namespaces.intersection(match.namespaces))
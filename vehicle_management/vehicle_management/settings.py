@@ -11,12 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+from decouple import config, Csv
 import os
+import tempfile
 import dj_database_url
+from .db import configure_connection_reuse
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -65,6 +64,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'vehicle_management.replicas.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -109,6 +109,23 @@ else:
         }
     }
 
+# Reuse connections: a per-worker psycopg pool on PostgreSQL, persistent
+# connections elsewhere. See vehicle_management/db.py for the sizing rules.
+configure_connection_reuse(DATABASES['default'])
+
+# Read replicas (comma-separated database URLs). Safe requests to the vehicles
+# API read from a replica; a client whose vehicles API write succeeds is pinned
+# to the primary for REPLICA_PIN_SECONDS so it sees its own changes.
+REPLICA_DATABASES = []
+for index, replica_url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv())):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = configure_connection_reuse(dj_database_url.parse(replica_url))
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['vehicle_management.replicas.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,6 +146,25 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing. The first hasher is used for new hashes; a user whose
+# stored hash uses another one (or older Argon2 costs) is rehashed on login.
+# The Argon2 defaults (19 MiB, 2 passes) take ~25 ms per check versus ~350 ms
+# for Django's PBKDF2. Set PASSWORD_HASHER=pbkdf2 to keep PBKDF2.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='argon2')
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)  # KiB
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+
+PASSWORD_HASHERS = [
+    'authentication.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if PASSWORD_HASHER == 'pbkdf2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -164,19 +200,161 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20
+    'PAGE_SIZE': 20,
+    # Token buckets: "<burst>/<period>", refilled evenly over the period
+    'DEFAULT_THROTTLE_CLASSES': [
+        'vehicle_management.throttling.AnonBucketThrottle',
+        'vehicle_management.throttling.UserBucketThrottle',
+        'vehicle_management.throttling.ExpensiveQueryThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': config('THROTTLE_ANON_RATE', default='120/min'),
+        'user': config('THROTTLE_USER_RATE', default='600/min'),
+        'expensive': config('THROTTLE_EXPENSIVE_RATE', default='20/min'),
+    },
+    # Reverse proxies in front of gunicorn (1 on Render). Per-IP buckets use the
+    # address this many hops from the end of X-Forwarded-For; with 0 the header
+    # is ignored, so clients can't pick their own bucket by sending it
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
+# Search and pages past THROTTLE_DEEP_PAGE use the "expensive" budget, and are
+# rejected while the database pool is at least THROTTLE_SHED_SATURATION busy
+THROTTLE_DEEP_PAGE = config('THROTTLE_DEEP_PAGE', default=5, cast=int)
+THROTTLE_SHED_SATURATION = config('THROTTLE_SHED_SATURATION', default=0.9, cast=float)
+
+CACHES = {
+    # Each worker keeps an LRU of up to CACHE_L1_MAX_ENTRIES entries, for at
+    # most CACHE_L1_TIMEOUT seconds, in front of the 'shared' cache; changes
+    # made by other workers drop their copies within CACHE_INVALIDATION_POLL
+    # seconds
+    'default': {
+        'BACKEND': 'vehicle_management.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_L1_MAX_ENTRIES', default=1000, cast=int),
+            'L1_TIMEOUT': config('CACHE_L1_TIMEOUT', default=60, cast=int),
+            'INVALIDATION_POLL': config('CACHE_INVALIDATION_POLL', default=0.25, cast=float),
+        },
+    },
+    # SQLiteCache shares it between the workers on one host; point it at
+    # django.core.cache.backends.redis.RedisCache to share it across hosts.
+    # Keys are prefixed with the database name, so a test run or another
+    # checkout using the same location never sees this database's entries
+    'shared': {
+        'BACKEND': config('CACHE_BACKEND', default='vehicle_management.cache_backends.SQLiteCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(
+            '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'vehicle_cache.sqlite3'
+        )),
+        'KEY_FUNCTION': 'vehicle_management.cache_backends.database_key',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # Throttle buckets must be shared by every worker: SQLiteCache shares them
+    # on one host, use django.core.cache.backends.redis.RedisCache across hosts
+    'throttle': {
+        'BACKEND': config('THROTTLE_CACHE_BACKEND', default='vehicle_management.cache_backends.SQLiteCache'),
+        'LOCATION': config('THROTTLE_CACHE_LOCATION', default=os.path.join(
+            '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'vehicle_throttle.sqlite3'
+        )),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Vehicle list and gallery pagination: above this many rows PostgreSQL's
+# planner estimate replaces COUNT(*); exact counts are cached for COUNT_CACHE_TTL
+APPROXIMATE_COUNT_THRESHOLD = config('APPROXIMATE_COUNT_THRESHOLD', default=10000, cast=int)
+COUNT_CACHE_TTL = config('COUNT_CACHE_TTL', default=30, cast=int)
+
+# Soft-deleted vehicles and gallery images move to archive tables after this
+# many days (manage.py archive_inactive)
+ARCHIVE_RETENTION_DAYS = config('ARCHIVE_RETENTION_DAYS', default=90, cast=int)
+
+# /vehicles/changes/ holds back rows changed in the last CHANGES_FEED_LAG
+# seconds so transactions still in flight can't be skipped by a cursor
+CHANGES_FEED_LAG = config('CHANGES_FEED_LAG', default=5, cast=int)
+
+# Live vehicle events (/api/v1/async/vehicles/events/). Use
+# vehicles.events.PostgresNotifyBackend when writes and SSE clients are in
+# different processes (gunicorn + uvicorn, or several workers).
+EVENTS_BACKEND = config('EVENTS_BACKEND', default='vehicles.events.LocalBackend')
+EVENTS_MAX_SUBSCRIBERS = config('EVENTS_MAX_SUBSCRIBERS', default=10000, cast=int)
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+EVENTS_HEARTBEAT = config('EVENTS_HEARTBEAT', default=15, cast=int)
+
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development
 
 
 # Cloudinary Configuration
-cloudinary.config(
-    cloud_name=config('CLOUDINARY_CLOUD_NAME', default=''),
-    api_key=config('CLOUDINARY_API_KEY', default=''),
-    api_secret=config('CLOUDINARY_API_SECRET', default=''),
-)
+# Read by the cloudinary package when it is first imported during app loading,
+# so settings don't have to import the SDK (see gunicorn.conf.py for warm-up).
+CLOUDINARY = {
+    'cloud_name': config('CLOUDINARY_CLOUD_NAME', default=''),
+    'api_key': config('CLOUDINARY_API_KEY', default=''),
+    'api_secret': config('CLOUDINARY_API_SECRET', default=''),
+}
+
+# Direct-to-storage uploads: seconds a client has to upload and confirm, the
+# folder public_ids are issued under, and where clients POST files (blank for
+# Cloudinary; e.g. http://127.0.0.1:8001/image/upload for local_upload_server.py)
+DIRECT_UPLOAD_TTL = config('DIRECT_UPLOAD_TTL', default=900, cast=int)
+DIRECT_UPLOAD_FOLDER = config('DIRECT_UPLOAD_FOLDER', default='direct')
+DIRECT_UPLOAD_URL = config('DIRECT_UPLOAD_URL', default='')
+
+# Where collect_orphaned_assets lists and deletes image assets. Use
+# vehicles.asset_gc.LocalAssetStorage with ASSET_STORAGE_LOCAL_ROOT to run it
+# against a local directory instead of Cloudinary.
+ASSET_STORAGE_BACKEND = config('ASSET_STORAGE_BACKEND', default='vehicles.asset_gc.CloudinaryAssetStorage')
+ASSET_STORAGE_LOCAL_ROOT = config('ASSET_STORAGE_LOCAL_ROOT', default=os.path.join(tempfile.gettempdir(), 'vehicle_assets'))
+# Images of listings soft deleted or archived more than this many days ago
+# are deleted with their rows by collect_orphaned_assets (0 keeps them forever)
+ASSET_RETENTION_DAYS = config('ASSET_RETENTION_DAYS', default=365, cast=int)
+
+# Uploads whose perceptual hash is within IMAGE_DEDUP_THRESHOLD bits of a stored
+# image with the same dimensions reuse that image instead of uploading again
+IMAGE_DEDUP_ENABLED = config('IMAGE_DEDUP_ENABLED', default=True, cast=bool)
+IMAGE_DEDUP_THRESHOLD = config('IMAGE_DEDUP_THRESHOLD', default=3, cast=int)
+
+# "Similar vehicles" index: rebuilt from the database in a background thread
+# after this many seconds so changes made by other workers show up
+SIMILAR_VEHICLES_MAX_AGE = config('SIMILAR_VEHICLES_MAX_AGE', default=300, cast=int)
+
+# Memory-mapped columnar snapshot of active listings, shared by all workers on
+# a host. The vehicle list resolves filter + sort to a page of ids from it.
+LISTING_SNAPSHOT_ENABLED = config('LISTING_SNAPSHOT_ENABLED', default=True, cast=bool)
+LISTING_SNAPSHOT_DIR = config('LISTING_SNAPSHOT_DIR', default=os.path.join(tempfile.gettempdir(), 'vehicle_listings'))
+
+# Title autocomplete index: rebuilt at most this often (seconds) after changes
+AUTOCOMPLETE_REBUILD_INTERVAL = config('AUTOCOMPLETE_REBUILD_INTERVAL', default=30, cast=int)
+
+# Saved searches: per-user limit, how often each worker reloads its matcher
+# index from scratch in a background thread (changes are also picked up before
+# every match), and how
+# deliver_search_alerts sends alerts (vehicles.saved_searches.EmailAlertDelivery
+# once email is configured)
+SAVED_SEARCHES_PER_USER = config('SAVED_SEARCHES_PER_USER', default=50, cast=int)
+SAVED_SEARCH_INDEX_MAX_AGE = config('SAVED_SEARCH_INDEX_MAX_AGE', default=3600, cast=int)
+SEARCH_ALERT_DELIVERY = config('SEARCH_ALERT_DELIVERY', default='vehicles.saved_searches.LogAlertDelivery')
+
+# Precomputed homepage feed (/vehicles/home/): section sizes, seconds a rebuild
+# waits after a change to fold in further changes, how long the cached copy
+# may live without any rebuild, and the Cache-Control max-age sent to clients
+HOMEPAGE_LATEST_SIZE = config('HOMEPAGE_LATEST_SIZE', default=12, cast=int)
+HOMEPAGE_FEATURED_SIZE = config('HOMEPAGE_FEATURED_SIZE', default=8, cast=int)
+HOMEPAGE_GALLERY_SIZE = config('HOMEPAGE_GALLERY_SIZE', default=12, cast=int)
+HOMEPAGE_REBUILD_DELAY = config('HOMEPAGE_REBUILD_DELAY', default=5, cast=float)
+HOMEPAGE_CACHE_TTL = config('HOMEPAGE_CACHE_TTL', default=3600, cast=int)
+HOMEPAGE_MAX_AGE = config('HOMEPAGE_MAX_AGE', default=30, cast=int)
+
+# In-memory structures built once in the gunicorn master before it forks the
+# workers, which inherit them (vehicle_management/warmup.py)
+WARMUP_HOOKS = [
+    'vehicles.similarity.warm',
+    'vehicles.listing_snapshot.warm',
+    'vehicles.autocomplete.warm',
+    'vehicles.saved_searches.warm',
+    'vehicles.homepage.warm',
+]
 
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
@@ -0,0 +1,154 @@
+"""
+Token-bucket throttles for vehicle_management project.
+
+Rates use DRF's "<requests>/<period>" syntax from
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']: a bucket holds that many tokens
+(the burst) and refills continuously at requests/period. Anonymous clients
+get a bucket per IP, authenticated clients one per user (their token).
+
+Expensive query shapes (search, deep pages, views marked always_expensive)
+also draw from a separate, smaller "expensive" bucket, and are shed outright
+while the database connection pool is saturated. Rejected requests get a 429
+with Retry-After. throttle_wait() applies the same buckets to views outside
+DRF (the async views).
+
+Buckets live in the "throttle" cache, which must be shared by all gunicorn
+workers (a SQLiteCache file shared on one host by default; point it at Redis
+for several).
+Reads and writes are not atomic, so concurrent requests may slightly
+overrun a bucket, as with DRF's own throttles.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .db import pool_metrics
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        self.cache = caches['throttle']
+        self.capacity, self.refill_rate = self.parse_rate(api_settings.DEFAULT_THROTTLE_RATES[self.scope])
+        self.wait_time = None
+
+    def parse_rate(self, rate):
+        """
+        "<requests>/<period>" -> (bucket capacity, tokens refilled per second)
+        """
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), int(num) / duration
+
+    def get_cache_key(self, request, view):
+        """
+        Bucket key for this request, or None to skip throttling it
+        """
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def client_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        key = f'throttle:{self.scope}:{key}'
+
+        now = time.time()
+        tokens, updated_at = self.cache.get(key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.wait_time = (1 - tokens) / self.refill_rate
+        # Expire once the bucket would be full again anyway
+        self.cache.set(key, (tokens, now), int((self.capacity - tokens) / self.refill_rate) + 1)
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    """
+    Per-IP bucket for anonymous requests
+    """
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.client_key(request)
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """
+    Per-user bucket for token-authenticated requests
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return self.client_key(request)
+        return None
+
+
+def is_expensive(request, view):
+    """
+    Whether a read is likely to scan a large part of a table
+    """
+    if request.method != 'GET':
+        return False
+    if getattr(view, 'always_expensive', False):
+        return True
+    params = request.query_params
+    if params.get('search'):
+        return True
+    try:
+        return int(params.get('page', 1)) > settings.THROTTLE_DEEP_PAGE
+    except ValueError:
+        return False
+
+
+class ExpensiveQueryThrottle(TokenBucketThrottle):
+    """
+    Separate bucket for expensive reads, shed while the DB pool is saturated
+    """
+    scope = 'expensive'
+
+    def get_cache_key(self, request, view):
+        if not is_expensive(request, view):
+            return None
+        return self.client_key(request)
+
+    def allow_request(self, request, view):
+        if not is_expensive(request, view):
+            return True
+        if pool_metrics().get('saturation', 0.0) >= settings.THROTTLE_SHED_SATURATION:
+            self.wait_time = 1
+            return False
+        return super().allow_request(request, view)
+
+
+def throttle_wait(request, view=None):
+    """
+    Run the default throttles on a DRF Request, as APIView.check_throttles
+    does; returns None if allowed, else the seconds until a retry may succeed
+    """
+    durations = []
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, view):
+            durations.append(throttle.wait())
+    if not durations:
+        return None
+    return max((duration for duration in durations if duration is not None), default=0)
@@ -19,6 +19,7 @@ from django.urls import path, include
 from rest_framework import permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from .db import check_database, pool_metrics
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
@@ -33,26 +34,65 @@ def api_root(request):
             'authentication': {
                 'register': '/api/v1/auth/register/',
                 'login': '/api/v1/auth/login/',
+                'token_login': '/api/v1/auth/token/',
                 'logout': '/api/v1/auth/logout/',
                 'profile': '/api/v1/auth/profile/',
             },
             'vehicles': {
                 'list_create': '/api/v1/vehicles/',
+                'homepage': '/api/v1/vehicles/home/',
                 'detail': '/api/v1/vehicles/{id}/',
+                'similar': '/api/v1/vehicles/{id}/similar/',
+                'autocomplete': '/api/v1/vehicles/autocomplete/?q={prefix}',
+                'batch': '/api/v1/vehicles/batch/?ids={id},{id}',
+                'bulk_update': '/api/v1/vehicles/bulk/',
+                'changes': '/api/v1/vehicles/changes/?since={cursor}',
+                'image_upload': '/api/v1/vehicles/{id}/images/upload/',
+                'confirm_upload': '/api/v1/vehicles/uploads/confirm/',
+                'saved_searches': '/api/v1/vehicles/saved-searches/',
+                'search_alerts': '/api/v1/vehicles/saved-searches/alerts/',
                 
                 'stats': '/api/v1/vehicles/stats/',
             },
             'gallery': {
                 'list_create': '/api/v1/vehicles/gallery/',
                 'detail': '/api/v1/vehicles/gallery/{id}/',
+                'upload': '/api/v1/vehicles/gallery/upload/',
                 'description': 'Standalone gallery images (not attached to vehicles)',
+            },
+            'async': {
+                'description': 'Async read endpoints and image upload for ASGI deployments',
+                'vehicles': '/api/v1/async/vehicles/',
+                'detail': '/api/v1/async/vehicles/{id}/',
+                'gallery': '/api/v1/async/vehicles/gallery/',
+                'stats': '/api/v1/async/vehicles/stats/',
+                'upload_image': '/api/v1/async/vehicles/{id}/images/',
+                'events': '/api/v1/async/vehicles/events/',
+            },
+            'health': {
+                'database': '/api/v1/health/db/',
             }
         }
     })
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def database_health(request):
+    """
+    Database health check; admins also get connection pool wait time and
+    saturation metrics
+    """
+    health = check_database()
+    user = request.user
+    if user.is_authenticated and (user.is_admin or user.is_staff):
+        health['pool'] = pool_metrics()
+    return Response(health, status=200 if health['healthy'] else 503)
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', api_root, name='api-root'),
+    path('api/v1/health/db/', database_health, name='database-health'),
     path('api/v1/auth/', include('authentication.urls')),
     path('api/v1/vehicles/', include('vehicles.urls')),
+    path('api/v1/async/vehicles/', include('vehicles.async_urls')),
 ]
@@ -0,0 +1,70 @@
+"""
+Startup warm-up for vehicle_management project.
+
+gunicorn.conf.py calls warm_app() once in the master after the app is
+preloaded. It builds the in-memory indexes (WARMUP_HOOKS) there, so every
+forked worker inherits them copy-on-write instead of scanning the inventory
+itself. warm_worker() runs in each worker after fork and only opens its own
+database and cache connections, so workers start serving within moments.
+
+With PostgreSQL pooling, closing a connection only returns it to the pool,
+so the master closes its pools too: a forked worker would otherwise share
+the pool's open server connections, without the pool's threads.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def close_connections():
+    """
+    Close every database connection, and the connection pool behind it
+    """
+    connections.close_all()
+    for alias in connections:
+        # Only the PostgreSQL and Oracle backends pool connections
+        close_pool = getattr(connections[alias], 'close_pool', None)
+        if close_pool is not None:
+            close_pool()
+
+
+def warm_app():
+    """
+    Build process-wide state that is safe to share across forked workers
+    """
+    # Import every view module and compile the URL patterns
+    get_resolver().reverse_dict
+
+    for hook in settings.WARMUP_HOOKS:
+        try:
+            import_string(hook)()
+        except Exception:
+            # The index is built on first use in each worker instead
+            logger.warning('Warm-up hook %s failed', hook, exc_info=True)
+
+    # Connections must never be shared across a fork
+    close_connections()
+
+
+def warm_worker():
+    """
+    Open this worker's connections before it accepts requests
+    """
+    close_connections()
+
+    for alias in settings.DATABASES:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            logger.warning('Could not warm database connection %r', alias, exc_info=True)
+
+    for alias in settings.CACHES:
+        caches[alias].get('warmup')
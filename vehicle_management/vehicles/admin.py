@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Vehicle, VehicleImage, Gallery
+from .models import Vehicle, VehicleImage, Gallery, ImageAsset, SavedSearch, SearchAlert
+from .pagination import EstimatedCountPaginator
 
 class VehicleImageInline(admin.TabularInline):
     model = VehicleImage
@@ -8,11 +9,15 @@ class VehicleImageInline(admin.TabularInline):
 
 @admin.register(Vehicle)
 class VehicleAdmin(admin.ModelAdmin):
-    list_display = ('title', 'year', 'price', 'fuel_type', 'body_type', 'created_by', 'created_at', 'is_active')
-    list_filter = ('fuel_type', 'body_type', 'transmission', 'is_active', 'created_at')
+    list_display = ('title', 'year', 'price', 'fuel_type', 'body_type', 'created_by', 'created_at', 'is_active', 'is_featured')
+    list_filter = ('fuel_type', 'body_type', 'transmission', 'is_active', 'is_featured', 'created_at')
     search_fields = ('title', 'description', 'color', 'engine')
     ordering = ('-created_at',)
     inlines = [VehicleImageInline]
+    # Constant queries per changelist page: owners joined, cheap counts
+    list_select_related = ('created_by',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Basic Information', {
@@ -25,7 +30,7 @@ class VehicleAdmin(admin.ModelAdmin):
             'fields': ('features',)
         }),
         ('Status', {
-            'fields': ('is_active', 'created_by')
+            'fields': ('is_active', 'is_featured', 'created_by')
         }),
     )
     
@@ -42,14 +47,39 @@ class VehicleImageAdmin(admin.ModelAdmin):
     list_filter = ('is_primary', 'uploaded_at')
     search_fields = ('vehicle__title',)
     ordering = ('-uploaded_at',)
+    list_select_related = ('vehicle',)
+    autocomplete_fields = ('vehicle',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ImageAsset)
+class ImageAssetAdmin(admin.ModelAdmin):
+    """
+    Duplicate upload index; rows are created by uploads, not by hand
+    """
+    list_display = ('public_id', 'width', 'height', 'file_size', 'reuse_count', 'bytes_saved', 'last_reused_at')
+    search_fields = ('public_id',)
+    ordering = ('-reuse_count',)
+    readonly_fields = ('image', 'public_id', 'phash', 'reuse_count', 'bytes_saved', 'created_at', 'last_reused_at')
+    exclude = ('phash_band0', 'phash_band1', 'phash_band2', 'phash_band3')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
 
 
 @admin.register(Gallery)
 class GalleryAdmin(admin.ModelAdmin):
     list_display = ('title', 'uploaded_by', 'uploaded_at', 'is_active')
-    list_filter = ('is_active', 'uploaded_at', 'uploaded_by')
-    search_fields = ('title', 'description')
+    # Filtering by uploader would list every user; search by username instead
+    list_filter = ('is_active', 'uploaded_at')
+    search_fields = ('title', 'description', 'uploaded_by__username')
     ordering = ('-uploaded_at',)
+    list_select_related = ('uploaded_by',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Image Information', {
@@ -66,3 +96,24 @@ class GalleryAdmin(admin.ModelAdmin):
         if not change:  # If creating new object
             obj.uploaded_by = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'params', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'user__username')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(SearchAlert)
+class SearchAlertAdmin(admin.ModelAdmin):
+    list_display = ('user', 'vehicle', 'saved_search', 'created_at', 'delivered_at')
+    search_fields = ('user__username',)
+    list_select_related = ('user', 'vehicle', 'saved_search')
+    raw_id_fields = ('user', 'vehicle', 'saved_search')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,166 @@
+"""
+Archival of soft-deleted rows.
+
+Vehicles and gallery images are soft deleted (is_active=False). Rows that
+have been inactive for longer than the retention period are moved, in small
+batches, into the Archived* tables with INSERT ... SELECT followed by DELETE,
+so the hot tables and their indexes only hold live data. Ids, field values
+and creation timestamps are copied verbatim in both directions.
+"""
+
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedGallery, ArchivedVehicle, ArchivedVehicleImage, Gallery, SearchAlert, Vehicle, VehicleImage,
+)
+
+# (live model, archive model, column the ids are matched against), parents first
+VEHICLE_TABLES = (
+    (Vehicle, ArchivedVehicle, 'id'),
+    (VehicleImage, ArchivedVehicleImage, 'vehicle_id'),
+)
+GALLERY_TABLES = (
+    (Gallery, ArchivedGallery, 'id'),
+)
+# Rows that reference archived vehicles and are dropped rather than archived
+VEHICLE_DROPPED = (
+    (SearchAlert, 'vehicle_id'),
+)
+
+
+def _columns(model):
+    return [field.column for field in model._meta.concrete_fields]
+
+
+def _copy(source, target, key, ids, extra_columns=(), extra_params=()):
+    """
+    INSERT INTO target SELECT ... FROM source WHERE key IN ids, in one statement
+    """
+    columns = [column for column in _columns(target) if column not in extra_columns]
+    quote = connection.ops.quote_name
+    column_list = ', '.join(quote(column) for column in columns)
+    placeholders = ', '.join(['%s'] * len(ids))
+    extra_names = ''.join(f', {quote(column)}' for column in extra_columns)
+    extra_values = ''.join(', %s' for _ in extra_columns)
+    sql = (
+        f'INSERT INTO {quote(target._meta.db_table)} ({column_list}{extra_names}) '
+        f'SELECT {column_list}{extra_values} FROM {quote(source._meta.db_table)} '
+        f'WHERE {quote(key)} IN ({placeholders})'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*extra_params, *ids])
+        return cursor.rowcount
+
+
+def _delete(model, key, ids):
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(key)} IN ({placeholders})', ids
+        )
+        return cursor.rowcount
+
+
+def _move(tables, ids, archiving, dropped=()):
+    """
+    Copy then delete every table for ids; children are deleted before parents
+    """
+    now = timezone.now()
+    moved = {}
+    if archiving:
+        for model, key in dropped:
+            _delete(model, key, ids)
+    for source, archive, key in tables:
+        if archiving:
+            moved[source._meta.label] = _copy(source, archive, key, ids, ('archived_at',), (now,))
+        else:
+            moved[source._meta.label] = _copy(archive, source, key, ids)
+    for source, archive, key in reversed(tables):
+        _delete(source if archiving else archive, key, ids)
+    return moved
+
+
+def _archive_batches(model, tables, cutoff, batch_size, pause, max_batches, dropped=()):
+    candidates = model.objects.filter(is_active=False, updated_at__lt=cutoff).order_by('id')
+    totals = {}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            # Lock the batch so a concurrent re-activation can't be archived
+            ids = list(candidates.select_for_update().values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            for label, count in _move(tables, ids, archiving=True, dropped=dropped).items():
+                totals[label] = totals.get(label, 0) + count
+        batches += 1
+        yield batches, dict(totals)
+        if len(ids) < batch_size:
+            break
+        # Throttle so archival doesn't compete with live traffic for I/O
+        time.sleep(pause)
+
+
+def archive_vehicles(retention_days, batch_size=500, pause=0.5, max_batches=None):
+    """
+    Move vehicles inactive for more than retention_days, and their images,
+    into the archive tables. Yields (batches done, rows moved per model).
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    return _archive_batches(Vehicle, VEHICLE_TABLES, cutoff, batch_size, pause, max_batches, VEHICLE_DROPPED)
+
+
+def archive_gallery(retention_days, batch_size=500, pause=0.5, max_batches=None):
+    """
+    Move gallery images inactive for more than retention_days into the archive
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    return _archive_batches(Gallery, GALLERY_TABLES, cutoff, batch_size, pause, max_batches)
+
+
+def pending_counts(retention_days):
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    return {
+        model._meta.label: model.objects.filter(is_active=False, updated_at__lt=cutoff).count()
+        for model in (Vehicle, Gallery)
+    }
+
+
+@transaction.atomic
+def restore_vehicles(ids, activate=False):
+    """
+    Move archived vehicles and their images back into the live tables
+    """
+    ids = list(ArchivedVehicle.objects.filter(id__in=ids).values_list('id', flat=True))
+    if not ids:
+        return {}
+    moved = _move(VEHICLE_TABLES, ids, archiving=False)
+    # Restart the retention clock so the next run doesn't archive them again
+    Vehicle.objects.filter(id__in=ids).update(updated_at=timezone.now())
+    if activate:
+        # Save one by one so signals update the similarity index and snapshot
+        for vehicle in Vehicle.objects.filter(id__in=ids):
+            vehicle.is_active = True
+            vehicle.save(update_fields=['is_active', 'updated_at'])
+    return moved
+
+
+@transaction.atomic
+def restore_gallery(ids, activate=False):
+    """
+    Move archived gallery images back into the live table
+    """
+    ids = list(ArchivedGallery.objects.filter(id__in=ids).values_list('id', flat=True))
+    if not ids:
+        return {}
+    moved = _move(GALLERY_TABLES, ids, archiving=False)
+    restored = Gallery.objects.filter(id__in=ids)
+    if activate:
+        restored.update(is_active=True, updated_at=timezone.now())
+    else:
+        restored.update(updated_at=timezone.now())
+    return moved
@@ -0,0 +1,232 @@
+"""
+Garbage collection of orphaned image assets.
+
+Deleting a VehicleImage row (delete_vehicle_image) leaves its Cloudinary
+asset behind. The collector pages through every stored asset, diffs the
+public_ids against the image columns of VehicleImage, Gallery and their
+archive tables, and deletes the rest in chunks of 100 (Cloudinary's bulk
+delete limit), paced by a rate limiter.
+
+Soft-deleted and archived rows keep their assets so they can still be
+restored, but only for ASSET_RETENTION_DAYS: image rows of listings
+deactivated, or archived, longer ago than that release their assets. Those
+assets are deleted like orphans (unless a current row shares them through
+dedup), and the released rows are deleted with them, so a later restore
+brings the listing back without those images.
+
+Assets younger than a grace period are never deleted: an upload reaches
+storage before its database row is committed. The same goes for assets the
+dedup index handed to a new upload within the grace period, and deleted
+assets are dropped from that index.
+
+The storage backend is settings.ASSET_STORAGE_BACKEND. LocalAssetStorage
+is a stand-in that treats files under a directory as assets.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import ArchivedGallery, ArchivedVehicleImage, Gallery, ImageAsset, VehicleImage
+
+DELETE_CHUNK_SIZE = 100
+
+
+@dataclass
+class Asset:
+    public_id: str
+    created_at: datetime
+    bytes: int = 0
+
+
+class CloudinaryAssetStorage:
+    """
+    Stored images, listed and deleted through the Cloudinary Admin API
+    """
+
+    def list_assets(self, prefix=None):
+        from cloudinary import api
+
+        options = {'type': 'upload', 'resource_type': 'image', 'max_results': 500}
+        if prefix:
+            options['prefix'] = prefix
+        while True:
+            page = api.resources(**options)
+            for resource in page.get('resources', []):
+                yield Asset(resource['public_id'], parse_datetime(resource['created_at']), resource.get('bytes', 0))
+            if not page.get('next_cursor'):
+                return
+            options['next_cursor'] = page['next_cursor']
+
+    def delete(self, public_ids):
+        from cloudinary import api
+
+        result = api.delete_resources(list(public_ids), resource_type='image', type='upload')
+        return [public_id for public_id, state in result.get('deleted', {}).items() if state == 'deleted']
+
+
+class LocalAssetStorage:
+    """
+    Files under settings.ASSET_STORAGE_LOCAL_ROOT, keyed by their path
+    without extension, as a stand-in for Cloudinary in development and tests
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root or settings.ASSET_STORAGE_LOCAL_ROOT)
+
+    def _files(self):
+        return {path.relative_to(self.root).with_suffix('').as_posix(): path
+                for path in self.root.rglob('*') if path.is_file()}
+
+    def list_assets(self, prefix=None):
+        for public_id, path in sorted(self._files().items()):
+            if prefix and not public_id.startswith(prefix):
+                continue
+            stat = path.stat()
+            created_at = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+            yield Asset(public_id, created_at, stat.st_size)
+
+    def delete(self, public_ids):
+        files = self._files()
+        deleted = []
+        for public_id in public_ids:
+            path = files.get(public_id)
+            if path is not None:
+                os.remove(path)
+                deleted.append(public_id)
+        return deleted
+
+
+def get_storage(path=None):
+    return import_string(path or settings.ASSET_STORAGE_BACKEND)()
+
+
+class RateLimiter:
+    """
+    Space calls at least 1/per_second seconds apart
+    """
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second > 0 else 0
+        self.last_call = None
+
+    def wait(self):
+        if self.last_call is not None:
+            remaining = self.interval - (time.monotonic() - self.last_call)
+            if remaining > 0:
+                time.sleep(remaining)
+        self.last_call = time.monotonic()
+
+
+def retention_filters(released_before):
+    """
+    Per image model, the rows that keep their asset
+    """
+    return {
+        VehicleImage: Q(vehicle__is_active=True) | Q(vehicle__updated_at__gte=released_before),
+        Gallery: Q(is_active=True) | Q(updated_at__gte=released_before),
+        ArchivedVehicleImage: Q(archived_at__gte=released_before),
+        ArchivedGallery: Q(archived_at__gte=released_before),
+    }
+
+
+def referenced_public_ids(released_before=None):
+    """
+    (public_ids some row keeps, {public_id: [(model, pk), ...]} of released
+    rows). Without released_before every row keeps its asset.
+    """
+    referenced = set()
+    released = {}
+    if released_before is None:
+        filters = {model: Q() for model in (VehicleImage, Gallery, ArchivedVehicleImage, ArchivedGallery)}
+    else:
+        filters = retention_filters(released_before)
+    for model, keeps in filters.items():
+        for image in model.objects.filter(keeps).values_list('image', flat=True).iterator(chunk_size=5000):
+            if image:
+                referenced.add(getattr(image, 'public_id', image))
+        if released_before is None:
+            continue
+        rows = model.objects.exclude(keeps).values_list('pk', 'image').iterator(chunk_size=5000)
+        for pk, image in rows:
+            if image:
+                released.setdefault(getattr(image, 'public_id', image), []).append((model, pk))
+    return referenced, released
+
+
+@dataclass
+class CollectionReport:
+    scanned: int = 0
+    too_recent: int = 0
+    orphaned: int = 0
+    orphaned_bytes: int = 0
+    deleted: int = 0
+    failed: int = 0
+    released_rows: int = 0  # Rows of long-deleted listings whose asset went with them
+
+
+def default_retention():
+    days = settings.ASSET_RETENTION_DAYS
+    return timedelta(days=days) if days else None
+
+
+def collect_orphans(storage=None, dry_run=True, prefix=None, min_age=timedelta(hours=24),
+                    deletes_per_second=1.0, on_orphan=None, retention=default_retention):
+    """
+    Delete (or with dry_run, only count) stored assets no row references, or
+    only rows deleted or archived more than retention ago (None: keep those)
+    """
+    storage = storage or get_storage()
+    if callable(retention):
+        retention = retention()
+    released_before = timezone.now() - retention if retention is not None else None
+    referenced, released = referenced_public_ids(released_before)
+    cutoff = timezone.now() - min_age
+    recently_reused = set(
+        ImageAsset.objects.filter(last_reused_at__gt=cutoff).values_list('public_id', flat=True)
+    )
+    limiter = RateLimiter(deletes_per_second)
+    report = CollectionReport()
+    chunk = []
+
+    def flush():
+        limiter.wait()
+        deleted = storage.delete(chunk)
+        ImageAsset.objects.filter(public_id__in=deleted).delete()
+        rows = {}
+        for public_id in deleted:
+            for model, pk in released.get(public_id, ()):
+                rows.setdefault(model, []).append(pk)
+        for model, pks in rows.items():
+            model.objects.filter(pk__in=pks).delete()
+        report.deleted += len(deleted)
+        report.failed += len(chunk) - len(deleted)
+        chunk.clear()
+
+    for asset in storage.list_assets(prefix):
+        report.scanned += 1
+        if asset.public_id in referenced:
+            continue
+        if asset.created_at > cutoff or asset.public_id in recently_reused:
+            report.too_recent += 1
+            continue
+        report.orphaned += 1
+        report.orphaned_bytes += asset.bytes
+        report.released_rows += len(released.get(asset.public_id, ()))
+        if on_orphan:
+            on_orphan(asset)
+        if not dry_run:
+            chunk.append(asset.public_id)
+            if len(chunk) == DELETE_CHUNK_SIZE:
+                flush()
+    if chunk:
+        flush()
+    return report
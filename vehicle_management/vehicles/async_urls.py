@@ -0,0 +1,18 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'vehicles_async'
+
+urlpatterns = [
+    # Async read endpoints (serve with an ASGI server, see vehicle_management/asgi.py)
+    path('', async_views.vehicle_list, name='vehicle-list'),
+    path('<int:pk>/', async_views.vehicle_detail, name='vehicle-detail'),
+    path('gallery/', async_views.gallery, name='gallery'),
+    path('stats/', async_views.vehicle_stats, name='vehicle-stats'),
+
+    # Server-sent events (ASGI only: each connection stays open)
+    path('events/', async_views.vehicle_events, name='vehicle-events'),
+
+    # Async image upload
+    path('<int:vehicle_id>/images/', async_views.upload_vehicle_image, name='vehicle-images'),
+]
@@ -0,0 +1,269 @@
+"""
+Async versions of the read endpoints and the vehicle image upload.
+
+These run natively under ASGI (vehicle_management.asgi) using Django's async
+ORM, so a worker waiting on the database or on a Cloudinary upload keeps
+serving other requests. Responses match the DRF views in views.py.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import serializers, status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .dedup import match_upload, record_upload
+from .image_metadata import analyse_image
+from .models import Vehicle, VehicleImage, Gallery
+from .pagination import count_rows
+from .serializers import (
+    VehicleSerializer, VehicleListSerializer, VehicleImageSerializer,
+    GallerySerializer
+)
+from .views import filter_vehicles
+from . import events
+from vehicle_management.throttling import throttle_wait
+
+
+class ImageUploadSerializer(serializers.Serializer):
+    image = serializers.ImageField()
+    is_primary = serializers.BooleanField(default=False)
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def authenticate(request):
+    """
+    Async equivalent of DRF TokenAuthentication; returns the user or None
+    """
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword != 'Token' or not key:
+        return None
+    try:
+        token = await Token.objects.select_related('user').aget(key=key.strip())
+    except Token.DoesNotExist:
+        return None
+    return token.user if token.user.is_active else None
+
+
+async def throttled(request, user=None, always_expensive=False):
+    """
+    The 429 response DRF views give when a throttle bucket is empty, or None
+    """
+    drf_request = Request(request)
+    drf_request.user = user or AnonymousUser()
+    view = SimpleNamespace(always_expensive=always_expensive)
+    wait = await sync_to_async(throttle_wait)(drf_request, view)
+    if wait is None:
+        return None
+    exc = Throttled(wait)
+    response = json_response({'detail': exc.detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    if exc.wait:
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+def page_bounds(request):
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    return page, (page - 1) * page_size, page * page_size
+
+
+def paginated(request, page, count, end, results, approximate=False):
+    """
+    Wrap results in the same envelope as EstimatedCountPagination
+    """
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if end < count else None
+    if page == 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'count_is_approximate': approximate,
+        'next': next_url,
+        'previous': previous_url,
+        'results': results,
+    }
+
+
+@require_GET
+async def vehicle_list(request):
+    """
+    List active vehicles with the same search and filters as VehicleListCreateView
+    """
+    response = await throttled(request, await authenticate(request))
+    if response is not None:
+        return response
+    queryset = filter_vehicles(
+        Vehicle.objects.filter(is_active=True).select_related('created_by').prefetch_related('images'),
+        request.GET,
+    )
+    page, start, end = page_bounds(request)
+    count, approximate = await sync_to_async(count_rows)(queryset)
+    vehicles = [vehicle async for vehicle in queryset[start:end]]
+    results = VehicleListSerializer(vehicles, many=True).data
+    return json_response(paginated(request, page, count, end, results, approximate))
+
+
+@require_GET
+async def vehicle_detail(request, pk):
+    """
+    Retrieve an active vehicle with its images
+    """
+    response = await throttled(request, await authenticate(request))
+    if response is not None:
+        return response
+    try:
+        vehicle = await Vehicle.objects.select_related('created_by').prefetch_related('images').aget(pk=pk, is_active=True)
+    except Vehicle.DoesNotExist:
+        return json_response({'detail': 'No Vehicle matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(VehicleSerializer(vehicle).data)
+
+
+@require_GET
+async def gallery(request):
+    """
+    List random active gallery images, like GalleryView
+    """
+    # ORDER BY random() scans the table, so it always draws on the expensive budget
+    response = await throttled(request, await authenticate(request), always_expensive=True)
+    if response is not None:
+        return response
+    try:
+        limit = int(request.GET.get('limit', 50))
+    except ValueError:
+        limit = 50
+    sample = Gallery.objects.filter(is_active=True).select_related('uploaded_by').order_by('?')[:limit]
+    images = [image async for image in sample]
+    page, start, end = page_bounds(request)
+    results = GallerySerializer(images[start:end], many=True).data
+    return json_response(paginated(request, page, len(images), end, results))
+
+
+@require_GET
+async def vehicle_stats(request):
+    """
+    Get vehicle statistics
+    """
+    user = await authenticate(request)
+    if user is None:
+        return json_response({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    response = await throttled(request, user)
+    if response is not None:
+        return response
+
+    return json_response({
+        'total_vehicles': await Vehicle.objects.filter(is_active=True).acount(),
+        'total_vehicle_images': await VehicleImage.objects.acount(),
+        'total_gallery_images': await Gallery.objects.filter(is_active=True).acount(),
+    })
+
+
+@csrf_exempt
+@require_POST
+async def upload_vehicle_image(request, vehicle_id):
+    """
+    Add an image to a vehicle; the Cloudinary upload runs off the event loop
+    """
+    user = await authenticate(request)
+    if user is None:
+        return json_response({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    response = await throttled(request, user)
+    if response is not None:
+        return response
+
+    try:
+        vehicle = await Vehicle.objects.aget(id=vehicle_id)
+    except Vehicle.DoesNotExist:
+        return json_response({'detail': 'No Vehicle matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+
+    if vehicle.created_by_id != user.id and not user.is_admin:
+        return json_response({'detail': "You don't have permission to add images to this vehicle."}, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = ImageUploadSerializer(data={**request.POST.dict(), **request.FILES.dict()})
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    from cloudinary import uploader
+
+    file = serializer.validated_data['image']
+    # thread_sensitive=False lets uploads run in parallel instead of queueing
+    # behind the single thread the async ORM uses
+    upload = await sync_to_async(match_upload)(
+        *await sync_to_async(analyse_image, thread_sensitive=False)(file)
+    )
+    if upload.asset is not None:
+        resource = upload.asset.image  # Already stored; skip the upload
+    else:
+        resource = await sync_to_async(uploader.upload_resource, thread_sensitive=False)(
+            file, type='upload', resource_type='image'
+        )
+    image = await VehicleImage.objects.acreate(
+        vehicle=vehicle,
+        image=resource,
+        is_primary=serializer.validated_data['is_primary'],
+        **upload.metadata,
+    )
+    await sync_to_async(record_upload)(image.image, upload)
+    return json_response(VehicleImageSerializer(image).data, status=status.HTTP_201_CREATED)
+
+
+@require_GET
+async def vehicle_events(request):
+    """
+    Server-sent events stream of vehicle created/repriced/deactivated events
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI Django buffers the whole endless stream, pinning a sync worker
+        return json_response({'error': 'Event streams are only served by the ASGI application'},
+                             status.HTTP_501_NOT_IMPLEMENTED)
+    response = await throttled(request, await authenticate(request))
+    if response is not None:
+        return response
+    subscription = events.broadcaster.subscribe()
+    if subscription is None:
+        response = json_response({'error': 'Too many event stream connections'}, status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '30'
+        return response
+
+    async def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), settings.EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield 'event: resync\ndata: {}\n\n'
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            events.broadcaster.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,154 @@
+"""
+In-process title autocomplete.
+
+Suggestions are the first one to three words of active listing titles (make,
+make + model, make + model + trim) with the number of listings that start
+with each phrase. Phrases are kept in a sorted array, which acts as a compact
+prefix trie: a prefix maps to one contiguous range found by binary search.
+The top suggestions for every prefix whose range holds more than SCAN_LIMIT
+phrases ("t", "toyo", "toyota c", ...) are computed at build time, so a
+lookup either reads a precomputed list or ranks at most SCAN_LIMIT phrases.
+benchmark_autocomplete.py measures lookups against a million titles.
+
+The index is rebuilt in a background thread when listings change (the
+listing snapshot's changed marker moves), at most once per
+AUTOCOMPLETE_REBUILD_INTERVAL seconds.
+"""
+
+import bisect
+import heapq
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .listing_snapshot import last_changed
+from .models import Vehicle
+
+logger = logging.getLogger(__name__)
+
+MAX_WORDS = 3
+SCAN_LIMIT = 256
+MAX_SUGGESTIONS = 20
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+class AutocompleteIndex:
+    """
+    Sorted phrase table with precomputed top suggestions for broad prefixes
+    """
+
+    def __init__(self, titles, changed_at=None):
+        counts = Counter()
+        spellings = defaultdict(Counter)
+        for title in titles:
+            words = title.split()
+            for length in range(1, min(len(words), MAX_WORDS) + 1):
+                label = ' '.join(words[:length])
+                key = label.lower()
+                counts[key] += 1
+                spellings[key][label] += 1
+
+        self.keys = sorted(counts)
+        self.counts = [counts[key] for key in self.keys]
+        # Show each phrase in its most common capitalization
+        self.labels = [spellings[key].most_common(1)[0][0] for key in self.keys]
+
+        # Prefixes whose range is too long to scan per lookup. Keys are sorted,
+        # so a prefix's range starts at the first key seen with it, and once a
+        # prefix of a key is narrow enough, its longer prefixes are too
+        broad = set()
+        for i, key in enumerate(self.keys):
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                if prefix in broad:
+                    continue
+                if bisect.bisect_left(self.keys, prefix + '\uffff', i) - i <= SCAN_LIMIT:
+                    break
+                broad.add(prefix)
+
+        # Visiting phrases best first fills each prefix's list in rank order
+        self.top = {}
+        for i in sorted(range(len(self.keys)), key=self._rank):
+            key = self.keys[i]
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                if prefix not in broad:
+                    break
+                top = self.top.setdefault(prefix, [])
+                if len(top) < MAX_SUGGESTIONS:
+                    top.append(i)
+
+        self.changed_at = changed_at
+        self.built_at = time.monotonic()
+
+    def _rank(self, i):
+        return (-self.counts[i], self.keys[i])
+
+    def suggest(self, query, limit=10):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        if prefix in self.top:
+            candidates = self.top[prefix][:limit]
+        else:
+            # At most SCAN_LIMIT phrases
+            lo = bisect.bisect_left(self.keys, prefix)
+            hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+            candidates = heapq.nsmallest(limit, range(lo, hi), key=self._rank)
+        return [{'text': self.labels[i], 'count': self.counts[i]} for i in candidates]
+
+
+def build_index():
+    changed_at = last_changed()
+    titles = Vehicle.objects.filter(is_active=True).values_list('title', flat=True)
+    return AutocompleteIndex(titles.iterator(chunk_size=10000), changed_at)
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def _rebuild_in_background():
+    if not _build_lock.acquire(blocking=False):
+        return  # Already rebuilding
+
+    def rebuild():
+        global _index
+        try:
+            _index = build_index()
+        except Exception:
+            logger.exception('Autocomplete index rebuild failed')
+        finally:
+            _build_lock.release()
+            connection.close()
+
+    threading.Thread(target=rebuild, name='autocomplete-rebuild', daemon=True).start()
+
+
+def suggest(query, limit=10):
+    """
+    Return up to limit {'text', 'count'} suggestions for a title prefix
+    """
+    global _index
+    index = _index
+    if index is None:
+        with _build_lock:
+            if _index is None:
+                _index = build_index()
+        index = _index
+    elif (last_changed() != index.changed_at
+          and time.monotonic() - index.built_at > settings.AUTOCOMPLETE_REBUILD_INTERVAL):
+        # Keep answering from the current index while the new one builds
+        _rebuild_in_background()
+    return index.suggest(query, min(limit, MAX_SUGGESTIONS))
+
+
+def warm():
+    suggest('')
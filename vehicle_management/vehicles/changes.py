@@ -0,0 +1,64 @@
+"""
+Incremental change feed over vehicles.
+
+Every create, edit and soft delete bumps Vehicle.updated_at, so walking the
+(updated_at, id) index from a cursor yields exactly the rows changed since
+then. The cursor is the (updated_at, id) of the last row returned.
+
+Rows changed in the last CHANGES_FEED_LAG seconds are held back: updated_at
+is set before the transaction commits, so a slow transaction could otherwise
+commit a row behind a cursor that has already moved past it.
+"""
+
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Vehicle
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class ExpiredCursor(ValueError):
+    pass
+
+
+def encode_cursor(updated_at, vehicle_id):
+    micros = int(updated_at.timestamp() * 1_000_000)
+    return base64.urlsafe_b64encode(f'{micros}:{vehicle_id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        micros, vehicle_id = base64.urlsafe_b64decode(padded).decode().split(':')
+        updated_at = datetime.fromtimestamp(int(micros) / 1_000_000, tz=dt_timezone.utc)
+        return updated_at, int(vehicle_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor('Invalid cursor') from exc
+
+
+def changes_since(cursor=None, limit=100):
+    """
+    Return (vehicles changed after cursor in (updated_at, id) order, has_more)
+    """
+    queryset = Vehicle.objects.select_related('created_by').prefetch_related('images').filter(
+        updated_at__lte=timezone.now() - timedelta(seconds=settings.CHANGES_FEED_LAG)
+    )
+    if cursor:
+        updated_at, vehicle_id = decode_cursor(cursor)
+        # Soft-deleted rows are archived after the retention period, so an
+        # older cursor would silently miss their tombstones
+        if updated_at < timezone.now() - timedelta(days=settings.ARCHIVE_RETENTION_DAYS):
+            raise ExpiredCursor('Cursor is older than the archive retention period; resync from the start')
+        # (updated_at, id) > cursor, with updated_at >= as the index range bound
+        queryset = queryset.filter(updated_at__gte=updated_at).filter(
+            Q(updated_at__gt=updated_at) | Q(id__gt=vehicle_id)
+        )
+    vehicles = list(queryset.order_by('updated_at', 'id')[:limit + 1])
+    return vehicles[:limit], len(vehicles) > limit
@@ -0,0 +1,136 @@
+"""
+Perceptual-hash deduplication of uploaded images.
+
+Dealers upload the same photos again across listings and edits. Every
+upload through VehicleImage or Gallery is hashed (image_metadata.perceptual_hash)
+before it reaches Cloudinary, and the hash is looked up in ImageAsset. If a
+stored image with the same dimensions is within IMAGE_DEDUP_THRESHOLD bits,
+the new row points at that asset and the upload is skipped; otherwise the
+image is uploaded and indexed.
+
+Near matches are found with indexed equality lookups rather than a scan:
+the 64-bit hash is split into four 16-bit bands, each with its own index,
+and two hashes that differ in at most 3 bits must agree on at least one
+band. Thresholds above 3 still work but may miss some matches.
+"""
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .image_metadata import analyse_image
+from .models import ImageAsset
+
+BANDS = 4
+BAND_BITS = 16
+# Upper bound on rows compared per lookup (e.g. many near-blank images)
+MAX_CANDIDATES = 200
+
+METADATA_FIELDS = ['width', 'height', 'file_size', 'image_format', 'dominant_color', 'placeholder']
+
+
+def split_bands(phash):
+    return [(phash >> (BAND_BITS * (BANDS - 1 - i))) & 0xFFFF for i in range(BANDS)]
+
+
+def to_signed(phash):
+    return phash - (1 << 64) if phash >= 1 << 63 else phash
+
+
+def to_unsigned(phash):
+    return phash & ((1 << 64) - 1)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def find_duplicate(phash, width, height):
+    """
+    Closest indexed asset within the threshold, or None
+    """
+    bands = Q()
+    for i, band in enumerate(split_bands(phash)):
+        bands |= Q(**{f'phash_band{i}': band})
+    candidates = ImageAsset.objects.filter(bands, width=width, height=height)[:MAX_CANDIDATES]
+
+    best, best_distance = None, settings.IMAGE_DEDUP_THRESHOLD + 1
+    for asset in candidates:
+        distance = hamming(phash, to_unsigned(asset.phash))
+        if distance < best_distance:
+            best, best_distance = asset, distance
+    return best
+
+
+@dataclass
+class PreparedUpload:
+    metadata: dict
+    phash: int
+    file_size: int
+    asset: ImageAsset = None  # Existing asset to reuse instead of uploading
+
+
+def match_upload(metadata, phash):
+    """
+    Look up an analysed upload; a match brings the stored asset's metadata
+    """
+    upload = PreparedUpload(metadata, phash, metadata['file_size'])
+    if settings.IMAGE_DEDUP_ENABLED:
+        upload.asset = find_duplicate(phash, metadata['width'], metadata['height'])
+        if upload.asset is not None:
+            upload.metadata = {field: getattr(upload.asset, field) for field in METADATA_FIELDS}
+    return upload
+
+
+def prepare_upload(file):
+    """
+    Hash and analyse an uploaded file and look for a stored duplicate
+    """
+    return match_upload(*analyse_image(file))
+
+
+def index_asset(image, metadata, phash):
+    """
+    Add a stored image to the hash index (no-op if already indexed)
+    """
+    public_id = getattr(image, 'public_id', None)
+    if not public_id:
+        return
+    ImageAsset.objects.get_or_create(public_id=public_id, defaults={
+        'image': image,
+        'phash': to_signed(phash),
+        **{f'phash_band{i}': band for i, band in enumerate(split_bands(phash))},
+        **metadata,
+    })
+
+
+def record_upload(image, upload):
+    """
+    After the row is saved: count the skipped upload, or index the new asset
+    """
+    if upload.asset is not None:
+        ImageAsset.objects.filter(pk=upload.asset.pk).update(
+            reuse_count=F('reuse_count') + 1,
+            bytes_saved=F('bytes_saved') + upload.file_size,
+            last_reused_at=timezone.now(),
+        )
+    elif settings.IMAGE_DEDUP_ENABLED:
+        index_asset(image, upload.metadata, upload.phash)
+
+
+def savings():
+    """
+    Totals for the dedup report
+    """
+    totals = ImageAsset.objects.aggregate(
+        uploads_skipped=Sum('reuse_count'),
+        bytes_saved=Sum('bytes_saved'),
+        bytes_stored=Sum('file_size'),
+    )
+    return {
+        'assets': ImageAsset.objects.count(),
+        'reused_assets': ImageAsset.objects.filter(reuse_count__gt=0).count(),
+        **{key: value or 0 for key, value in totals.items()},
+    }
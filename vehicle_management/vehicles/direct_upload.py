@@ -0,0 +1,101 @@
+"""
+Direct-to-storage image uploads.
+
+Image bytes go from the client straight to Cloudinary instead of through a
+gunicorn worker:
+
+1. The client asks for an upload slot (a vehicle's images or the gallery)
+   and gets signed Cloudinary upload fields plus an upload_token.
+2. It POSTs the file with those fields to upload_url.
+3. It sends Cloudinary's response (public_id, version, format, signature)
+   with the upload_token to the confirm endpoint, which creates the row.
+
+The upload_token is a Django-signed record of who may upload what to which
+slot, so nothing is stored between steps. Confirm checks it and checks the
+response signature Cloudinary computes from the API secret, so a client
+can't claim somebody else's asset. Metadata and the dedup index are filled
+in afterwards by backfill_image_metadata.
+
+DIRECT_UPLOAD_URL points step 2 at local_upload_server.py, which signs
+its responses the same way, for development and tests.
+"""
+
+import time
+import uuid
+
+import cloudinary
+from cloudinary import CloudinaryResource
+from cloudinary.utils import api_sign_request, verify_api_response_signature
+from django.conf import settings
+from django.core import signing
+
+TOKEN_SALT = 'vehicles.direct_upload'
+ALLOWED_FORMATS = ['jpg', 'jpeg', 'png', 'webp', 'heic']
+
+
+class InvalidUpload(Exception):
+    pass
+
+
+class ExpiredUpload(InvalidUpload):
+    pass
+
+
+def upload_url():
+    return settings.DIRECT_UPLOAD_URL or (
+        f'https://api.cloudinary.com/v1_1/{cloudinary.config().cloud_name}/image/upload'
+    )
+
+
+def issue_upload(user, vehicle=None, is_primary=False):
+    """
+    Signed upload fields for one image in a vehicle's images, or the gallery
+    """
+    config = cloudinary.config()
+    slot = f'vehicles/{vehicle.id}' if vehicle else f'gallery/{user.id}'
+    public_id = f'{settings.DIRECT_UPLOAD_FOLDER}/{slot}/{uuid.uuid4().hex}'
+
+    fields = {
+        'public_id': public_id,
+        'timestamp': int(time.time()),
+        'allowed_formats': ','.join(ALLOWED_FORMATS),
+    }
+    fields['signature'] = api_sign_request(fields, config.api_secret)
+    fields['api_key'] = config.api_key
+
+    token = signing.dumps({
+        'user': user.id,
+        'vehicle': vehicle.id if vehicle else None,
+        'is_primary': is_primary,
+        'public_id': public_id,
+    }, salt=TOKEN_SALT, compress=True)
+    return {
+        'upload_url': upload_url(),
+        'fields': fields,
+        'upload_token': token,
+        'expires_in': settings.DIRECT_UPLOAD_TTL,
+    }
+
+
+def verify_upload(user, upload_token, public_id, version, signature):
+    """
+    The slot an upload was issued for, once its storage response checks out
+    """
+    try:
+        slot = signing.loads(upload_token, salt=TOKEN_SALT, max_age=settings.DIRECT_UPLOAD_TTL)
+    except signing.SignatureExpired:
+        raise ExpiredUpload('Upload token has expired; request a new upload.')
+    except signing.BadSignature:
+        raise InvalidUpload('Invalid upload token.')
+
+    if slot['user'] != user.id:
+        raise InvalidUpload('Upload token was issued to another user.')
+    if public_id != slot['public_id']:
+        raise InvalidUpload('public_id does not match the issued upload.')
+    if not verify_api_response_signature(public_id, version, signature):
+        raise InvalidUpload('Upload signature is invalid.')
+    return slot
+
+
+def stored_image(public_id, version, image_format):
+    return CloudinaryResource(public_id, version=version, format=image_format, type='upload', resource_type='image')
@@ -0,0 +1,201 @@
+"""
+Live vehicle events for the server-sent events endpoint.
+
+Vehicle signals turn saves into small events (created, repriced, deactivated,
+reactivated) and hand them to the backend in settings.EVENTS_BACKEND after
+the transaction commits:
+
+- LocalBackend delivers them to subscribers in the same process only.
+- PostgresNotifyBackend sends them with pg_notify; every process that has
+  SSE clients runs one LISTEN thread that feeds its local broadcaster, so
+  writes made by gunicorn workers reach clients held by the ASGI server.
+
+The broadcaster keeps one bounded asyncio.Queue per connection and fans out
+with a single call_soon_threadsafe per event loop, so idle connections cost
+a queue and a suspended coroutine each. A client that falls
+EVENTS_QUEUE_SIZE events behind is told to resync from /vehicles/changes/.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from .changes import encode_cursor
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'vehicle_events'
+
+
+class Subscription:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        # Runs on the subscription's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broadcaster:
+    """
+    In-process fan-out of events to subscriptions on any event loop
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loops = {}  # event loop -> set of subscriptions on it
+        self.count = 0
+
+    def subscribe(self):
+        """
+        Return a new subscription on the running loop, or None when full
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.count >= settings.EVENTS_MAX_SUBSCRIBERS:
+                return None
+            subscription = Subscription(loop, settings.EVENTS_QUEUE_SIZE)
+            self._loops.setdefault(loop, set()).add(subscription)
+            self.count += 1
+        get_backend().start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._loops.get(subscription.loop)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.remove(subscription)
+                self.count -= 1
+                if not subscriptions:
+                    del self._loops[subscription.loop]
+
+    def dispatch(self, event):
+        """
+        Deliver an event to every subscription; safe to call from any thread
+        """
+        with self._lock:
+            targets = [(loop, list(subscriptions)) for loop, subscriptions in self._loops.items()]
+        for loop, subscriptions in targets:
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, event)
+            except RuntimeError:
+                pass  # Loop closed; its subscriptions are unsubscribed as they unwind
+
+
+def _deliver(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.offer(event)
+
+
+broadcaster = Broadcaster()
+
+
+class LocalBackend:
+    """
+    Events only reach subscribers in the process that saved the vehicle
+    """
+
+    def publish(self, event):
+        broadcaster.dispatch(event)
+
+    def start(self):
+        pass
+
+
+class PostgresNotifyBackend:
+    """
+    Events go through PostgreSQL NOTIFY so every process sees them. LISTEN
+    needs a session, so don't point this at a transaction-mode PgBouncer.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, json.dumps(event)])
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._listen, name='vehicle-events-listener', daemon=True).start()
+
+    def _listen(self):
+        import psycopg
+        from django.db import connections
+
+        params = connections['default'].get_connection_params()
+        while True:
+            try:
+                with psycopg.connect(**params, autocommit=True) as listener:
+                    listener.execute(f'LISTEN {CHANNEL}')
+                    for notify in listener.notifies():
+                        broadcaster.dispatch(json.loads(notify.payload))
+            except Exception:
+                logger.exception('Vehicle event listener lost its connection; reconnecting')
+                time.sleep(1)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.EVENTS_BACKEND)()
+    return _backend
+
+
+def change_type(vehicle, created):
+    """
+    The event a save represents, or None if subscribers don't care about it
+    """
+    if created:
+        return 'vehicle.created' if vehicle.is_active else None
+    loaded = getattr(vehicle, '_loaded_values', {})
+    was_active = loaded.get('is_active', vehicle.is_active)
+    if was_active and not vehicle.is_active:
+        return 'vehicle.deactivated'
+    if not was_active and vehicle.is_active:
+        return 'vehicle.reactivated'
+    if vehicle.is_active and 'price' in loaded and loaded['price'] != vehicle.price:
+        return 'vehicle.repriced'
+    return None
+
+
+def publish_change(vehicle, created=False):
+    """
+    Queue an event for a saved vehicle, sent once the transaction commits
+    """
+    event_type = change_type(vehicle, created)
+    # The next save of this instance compares against what was just saved
+    vehicle._loaded_values = {**getattr(vehicle, '_loaded_values', {}), 'is_active': vehicle.is_active, 'price': vehicle.price}
+    if event_type is None:
+        return
+    event = {
+        'type': event_type,
+        'id': vehicle.id,
+        'title': vehicle.title,
+        'price': str(vehicle.price),
+        'is_active': vehicle.is_active,
+        # Resume point for /vehicles/changes/ after a reconnect
+        'cursor': encode_cursor(vehicle.updated_at, vehicle.id),
+    }
+    transaction.on_commit(lambda: get_backend().publish(event), robust=True)
@@ -0,0 +1,165 @@
+"""
+Precomputed homepage feed.
+
+The homepage needs the latest listings, featured listings, a gallery sample
+and headline stats. Instead of running those queries on every visit, the
+whole payload is built in a background thread, rendered to JSON once (plus
+a gzipped copy) and stored in the default cache, which every worker shares.
+/vehicles/home/ only does a cache lookup and writes the stored bytes.
+
+Vehicle, image and gallery changes schedule a rebuild HOMEPAGE_REBUILD_DELAY
+seconds later; further changes in that window are folded into the same
+rebuild. Vehicle saves made by other workers or hosts are noticed through
+the listing snapshot's change marker (one cache lookup per request).
+"""
+
+import gzip
+import hashlib
+import logging
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max, Min
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .listing_snapshot import last_changed
+from .models import Gallery, Vehicle, VehicleImage
+from .pagination import count_rows
+from .serializers import GallerySerializer, VehicleListSerializer
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'homepage:feed'
+
+
+def sample_gallery(size):
+    """
+    Up to size random active gallery images, found by probing random ids
+    (one primary key lookup each) instead of loading every id
+    """
+    bounds = Gallery.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    active = Gallery.objects.filter(is_active=True).select_related('uploaded_by').order_by('id')
+    sample = {}
+    # Extra probes make up for ones landing on an image already picked
+    for _ in range(size * 3):
+        if len(sample) == size:
+            break
+        probe = random.randint(bounds['low'], bounds['high'])
+        image = active.filter(id__gte=probe).first() or active.filter(id__lt=probe).last()
+        if image is None:
+            break  # No active images at all
+        sample.setdefault(image.id, image)
+    return list(sample.values())
+
+
+def build_payload():
+    """
+    The homepage data, straight from the database
+    """
+    vehicles = (
+        Vehicle.objects.filter(is_active=True)
+        .select_related('created_by')
+        .prefetch_related('images')
+        .order_by('-created_at', '-id')
+    )
+
+    return {
+        'latest': VehicleListSerializer(vehicles[:settings.HOMEPAGE_LATEST_SIZE], many=True).data,
+        'featured': VehicleListSerializer(vehicles.filter(is_featured=True)[:settings.HOMEPAGE_FEATURED_SIZE], many=True).data,
+        'gallery': GallerySerializer(sample_gallery(settings.HOMEPAGE_GALLERY_SIZE), many=True).data,
+        # Planner estimates on large tables, as the list endpoints report
+        'stats': {
+            'total_vehicles': count_rows(Vehicle.objects.filter(is_active=True))[0],
+            'total_vehicle_images': count_rows(VehicleImage.objects.all())[0],
+            'total_gallery_images': count_rows(Gallery.objects.filter(is_active=True))[0],
+        },
+        'built_at': timezone.now(),
+    }
+
+
+def render_feed():
+    """
+    The cache entry: the rendered payload, gzipped copy and ETag
+    """
+    changed_at = last_changed()
+    body = JSONRenderer().render(build_payload())
+    return {
+        'body': body,
+        'gzip': gzip.compress(body, compresslevel=6),
+        'etag': '"%s"' % hashlib.sha1(body).hexdigest()[:20],
+        'changed_at': changed_at,
+    }
+
+
+def build_feed():
+    """
+    Render the payload and store it in the cache; returns the stored entry
+    """
+    entry = render_feed()
+    cache.set(CACHE_KEY, entry, settings.HOMEPAGE_CACHE_TTL)
+    return entry
+
+
+_lock = threading.Lock()
+_pending = None  # Timer of the scheduled rebuild, if any
+
+
+def schedule_rebuild(delay=None):
+    """
+    Rebuild after a delay, folding in any changes made meanwhile
+    """
+    global _pending
+    with _lock:
+        if _pending is not None:
+            return
+        delay = settings.HOMEPAGE_REBUILD_DELAY if delay is None else delay
+        _pending = threading.Timer(delay, _rebuild)
+        _pending.daemon = True
+        _pending.start()
+
+
+def _rebuild():
+    global _pending
+    with _lock:
+        # Changes from here on need another rebuild
+        _pending = None
+    try:
+        build_feed()
+    except Exception:
+        logger.exception('Homepage feed rebuild failed')
+    finally:
+        connection.close()
+
+
+def get_feed():
+    """
+    The cached feed; built in the request only if the cache has none at all
+    """
+    entry = cache.get(CACHE_KEY)
+    if entry is None:
+        # Concurrent misses in every worker wait for one build
+        entry = cache.get_or_set(CACHE_KEY, render_feed, settings.HOMEPAGE_CACHE_TTL)
+    elif last_changed() != entry['changed_at']:
+        schedule_rebuild()
+    return entry
+
+
+def warm():
+    """
+    Build the feed in the foreground: this runs in the gunicorn master, and a
+    rebuild Timer armed there would not survive the fork
+    """
+    global _pending
+    with _lock:
+        if _pending is not None:
+            _pending.cancel()
+            _pending = None
+    entry = cache.get(CACHE_KEY)
+    if entry is None or entry['changed_at'] != last_changed():
+        build_feed()
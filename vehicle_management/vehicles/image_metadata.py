@@ -0,0 +1,144 @@
+"""
+Image metadata extracted with Pillow when an image is uploaded.
+
+Clients get the dimensions, size, format, dominant color and a BlurHash
+placeholder (https://blurha.sh) with the image URL, so pages can reserve
+space and paint a blurred preview before the image itself loads. The
+perceptual hash is used to spot re-uploads of the same photo (dedup.py).
+"""
+
+import math
+
+import numpy as np
+from PIL import Image, ImageOps
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+# Images are reduced to at most this size before color analysis
+SAMPLE_SIZE = 64
+BLURHASH_COMPONENTS = (4, 3)
+PHASH_SIZE = 32
+
+# Orthonormal DCT-II matrix for the perceptual hash
+_DCT = np.array([
+    [math.sqrt((1 if k == 0 else 2) / PHASH_SIZE) * math.cos(math.pi * (2 * n + 1) * k / (2 * PHASH_SIZE))
+     for n in range(PHASH_SIZE)]
+    for k in range(PHASH_SIZE)
+])
+
+
+def _encode83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def _srgb_to_linear(values):
+    v = values / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value):
+    v = min(max(value, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image, x_components=BLURHASH_COMPONENTS[0], y_components=BLURHASH_COMPONENTS[1]):
+    """
+    BlurHash string for an RGB image (use a small sample; cost is per pixel)
+    """
+    pixels = _srgb_to_linear(np.asarray(image, dtype=np.float64))
+    height, width = pixels.shape[:2]
+    xs = np.arange(width) * math.pi / width
+    ys = np.arange(height) * math.pi / height
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            basis = np.outer(np.cos(ys * j), np.cos(xs * i))
+            normalisation = 1 if i == 0 and j == 0 else 2
+            factor = np.tensordot(basis, pixels, axes=([0, 1], [0, 1])) * normalisation / (width * height)
+            factors.append(factor)
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        quantised_max = max(0, min(82, int(max(float(np.abs(component).max()) for component in ac) * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _encode83(0, 1)
+
+    r, g, b = (_linear_to_srgb(float(channel)) for channel in dc)
+    result += _encode83((r << 16) + (g << 8) + b, 4)
+    for component in ac:
+        quantised = [
+            max(0, min(18, int(math.floor(_sign_pow(float(channel) / max_value, 0.5) * 9 + 9.5))))
+            for channel in component
+        ]
+        result += _encode83(quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2)
+    return result
+
+
+def dominant_color(image):
+    """
+    Most common color of an RGB image after reducing it to a small palette
+    """
+    palette_image = image.quantize(colors=8, method=Image.Quantize.MEDIANCUT)
+    _, index = max(palette_image.getcolors())
+    r, g, b = palette_image.getpalette()[index * 3:index * 3 + 3]
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def perceptual_hash(image):
+    """
+    64-bit DCT perceptual hash (pHash) of an image, as an unsigned int.
+    Re-encoded or lightly resized copies of a photo differ in a few bits.
+    """
+    gray = np.asarray(image.convert('L').resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.LANCZOS), dtype=np.float64)
+    low = (_DCT @ gray @ _DCT.T)[:8, :8].flatten()
+    # The DC term only reflects overall brightness, so it's left out of the median
+    bits = low > np.median(low[1:])
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def extract_metadata(file):
+    """
+    Metadata field values for an uploaded image file; leaves the file rewound
+    """
+    return analyse_image(file)[0]
+
+
+def analyse_image(file):
+    """
+    (metadata field values, perceptual hash) for an uploaded image file
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        image_format = (image.format or '').lower()
+        # Dimensions as displayed, i.e. after EXIF rotation
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):
+            width, height = height, width
+        # Decode JPEGs at a reduced scale; analysis only needs a thumbnail
+        image.draft('RGB', (SAMPLE_SIZE, SAMPLE_SIZE))
+        sample = ImageOps.exif_transpose(image).convert('RGB')
+        sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    file.seek(0, 2)
+    file_size = file.tell()
+    file.seek(0)
+
+    metadata = {
+        'width': width,
+        'height': height,
+        'file_size': file_size,
+        'image_format': image_format,
+        'dominant_color': dominant_color(sample),
+        'placeholder': blurhash(sample),
+    }
+    return metadata, perceptual_hash(sample)
@@ -0,0 +1,309 @@
+"""
+Memory-mapped columnar snapshot of active listings.
+
+The snapshot stores typed NumPy columns (ids, prices in cents, years, enum
+codes) plus precomputed sort orders, one .npy file per column, under
+settings.LISTING_SNAPSHOT_DIR. Workers open the files with mmap, so every
+gunicorn worker on a host shares one copy through the OS page cache.
+
+VehicleListCreateView resolves filter + sort to a page of ids here and only
+fetches those rows from the database. Vehicle saves on any worker or host
+replace a change marker in the shared default cache; a snapshot built under
+another marker is stale, so callers fall back to the ORM while a background
+rebuild publishes a new version.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils.text import slugify
+
+from .models import Vehicle
+
+logger = logging.getLogger(__name__)
+
+ENUM_FIELDS = ('fuel_type', 'transmission', 'body_type')
+SUPPORTED_PARAMS = {
+    'fuel_type', 'body_type', 'transmission',
+    'min_price', 'max_price', 'min_year', 'max_year',
+    'page', 'format', 'ordering',
+}
+# Same keys and id tiebreaks as views.VEHICLE_ORDERINGS: (sort column, reversed)
+ORDERINGS = {
+    '-created_at': ('by_created', False),
+    'price': ('by_price', False),
+    '-price': ('by_price', True),
+    '-year': ('by_year', True),
+    'mileage': ('by_mileage', False),
+}
+# Vehicles without a parsable mileage sort last, as NULLs do in the database
+NO_MILEAGE = np.iinfo(np.int64).max
+
+# A rebuild lock older than this is left over from a crashed worker
+LOCK_TIMEOUT = 300
+
+
+def snapshot_dir():
+    # One directory per database so test runs never read a dev snapshot
+    return Path(settings.LISTING_SNAPSHOT_DIR) / slugify(str(connection.settings_dict['NAME']))
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+CHANGED_KEY = 'listings:changed'
+
+
+def last_changed():
+    """
+    The current change marker of the listings, the same on every host;
+    anything built under a different marker is out of date
+    """
+    changed = cache.get(CHANGED_KEY)
+    if changed is None:
+        # Lost from the cache: derive one from the table, first writer wins
+        latest = Vehicle.objects.aggregate(updated_at=Max('updated_at'), count=Count('id'))
+        cache.add(CHANGED_KEY, f"db:{latest['updated_at']}:{latest['count']}", None)
+        changed = cache.get(CHANGED_KEY)
+    return changed
+
+
+def mark_changed():
+    """
+    Record that listings changed so current snapshots become stale
+    """
+    cache.set(CHANGED_KEY, uuid.uuid4().hex, None)
+
+
+def build_snapshot():
+    """
+    Write a new snapshot version from the database and make it current
+    """
+    directory = snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    changed_at = last_changed()
+
+    rows = Vehicle.objects.filter(is_active=True).order_by('id').values_list(
+        'id', 'price', 'year', 'created_at', 'mileage_value', *ENUM_FIELDS
+    )
+    ids, prices, years, created, mileages = [], [], [], [], []
+    enums = {field: [] for field in ENUM_FIELDS}
+    for vehicle_id, price, year, created_at, mileage, *enum_values in rows.iterator(chunk_size=10000):
+        ids.append(vehicle_id)
+        prices.append(int(price * 100))
+        years.append(year)
+        created.append(int(created_at.timestamp() * 1_000_000))
+        mileages.append(NO_MILEAGE if mileage is None else mileage)
+        for field, value in zip(ENUM_FIELDS, enum_values):
+            enums[field].append(value)
+
+    columns = {
+        'ids': np.array(ids, dtype=np.int64),
+        'price': np.array(prices, dtype=np.int64),
+        'year': np.array(years, dtype=np.int32),
+    }
+    vocabularies = {}
+    for field in ENUM_FIELDS:
+        vocabulary, codes = np.unique(np.array(enums[field], dtype=object), return_inverse=True)
+        vocabularies[field] = [str(value) for value in vocabulary]
+        columns[field] = codes.astype(np.int16)
+
+    # Sort orders with the id as a deterministic tiebreak; reversed for descending keys
+    created_at = np.array(created, dtype=np.int64)
+    mileage = np.array(mileages, dtype=np.int64)
+    columns['by_created'] = np.lexsort((-columns['ids'], -created_at)).astype(np.int32)
+    columns['by_price'] = np.lexsort((columns['ids'], columns['price'])).astype(np.int32)
+    columns['by_year'] = np.lexsort((columns['ids'], columns['year'])).astype(np.int32)
+    columns['by_mileage'] = np.lexsort((columns['ids'], mileage)).astype(np.int32)
+
+    version = f'v{time.time_ns()}-{os.getpid()}'
+    staging = directory / f'.{version}'
+    staging.mkdir()
+    for name, column in columns.items():
+        np.save(staging / f'{name}.npy', column)
+    meta = {'version': version, 'changed_at': changed_at, 'count': len(ids), 'vocabularies': vocabularies}
+    (staging / 'meta.json').write_text(json.dumps(meta))
+    staging.rename(directory / version)
+
+    pointer = directory / f'.CURRENT.{os.getpid()}'
+    pointer.write_text(version)
+    os.replace(pointer, directory / 'CURRENT')
+
+    # Keep the previous version for workers that are still mapping it
+    versions = sorted(path for path in directory.glob('v*') if path.is_dir())
+    for old in versions[:-2]:
+        shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+
+class ListingSnapshot:
+    """
+    One published snapshot version, with its columns memory-mapped
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = json.loads((path / 'meta.json').read_text())
+        self.columns = {
+            file.stem: np.load(file, mmap_mode='r') for file in path.glob('*.npy')
+        }
+        self.codes = {
+            field: {value: code for code, value in enumerate(vocabulary)}
+            for field, vocabulary in self.meta['vocabularies'].items()
+        }
+
+    def is_stale(self):
+        return last_changed() != self.meta['changed_at']
+
+    def resolve(self, params, ordering='-created_at'):
+        """
+        Return the ids matching the list filters, in order, or None when the
+        query needs the ORM (unsupported parameter or unparsable value)
+        """
+        if ordering not in ORDERINGS or not SUPPORTED_PARAMS.issuperset(
+            key for key, value in params.items() if value
+        ):
+            return None
+
+        columns = self.columns
+        mask = np.ones(self.meta['count'], dtype=bool)
+        try:
+            for field in ENUM_FIELDS:
+                value = params.get(field)
+                if value:
+                    code = self.codes[field].get(value)
+                    if code is None:
+                        return np.empty(0, dtype=np.int64)
+                    mask &= columns[field] == code
+            for param, column, compare, convert in (
+                ('min_price', 'price', np.greater_equal, _cents),
+                ('max_price', 'price', np.less_equal, _cents),
+                ('min_year', 'year', np.greater_equal, int),
+                ('max_year', 'year', np.less_equal, int),
+            ):
+                value = params.get(param)
+                if value:
+                    mask &= compare(columns[column], convert(value))
+        except (ValueError, InvalidOperation):
+            return None
+
+        order_column, reverse = ORDERINGS[ordering]
+        if order_column not in columns:
+            return None  # Published before this ordering existed
+        order = columns[order_column]
+        if reverse:
+            order = order[::-1]
+        return columns['ids'][order[mask[order]]]
+
+
+def _cents(value):
+    # Float so fractional cents compare correctly against the integer column
+    return float(Decimal(value) * 100)
+
+
+class SnapshotResult:
+    """
+    Ordered id list that fetches rows only for the slice being paginated
+    """
+
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        ids = [int(vehicle_id) for vehicle_id in np.atleast_1d(self.ids[index])]
+        vehicles = self.queryset.in_bulk(ids)
+        # Rows deactivated since the snapshot was built are simply skipped
+        return [vehicles[vehicle_id] for vehicle_id in ids if vehicle_id in vehicles]
+
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def current_snapshot(background=True):
+    """
+    Return the published snapshot if it is fresh, else None (scheduling a rebuild)
+    """
+    global _current
+    directory = snapshot_dir()
+    try:
+        version = (directory / 'CURRENT').read_text().strip()
+    except FileNotFoundError:
+        schedule_rebuild(background)
+        return None
+
+    snapshot = _current
+    if snapshot is None or snapshot.meta['version'] != version:
+        try:
+            snapshot = ListingSnapshot(directory / version)
+        except (OSError, ValueError):
+            logger.warning('Could not load listing snapshot %s', version, exc_info=True)
+            schedule_rebuild(background)
+            return None
+        with _current_lock:
+            _current = snapshot
+
+    if snapshot.is_stale():
+        schedule_rebuild(background)
+        return None
+    return snapshot
+
+
+def schedule_rebuild(background=True):
+    """
+    Rebuild, in a background thread unless background is False; a lock file
+    keeps it to one worker per host
+    """
+    directory = snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    lock = directory / 'rebuild.lock'
+    if time.time() - _mtime_ns(lock) / 1e9 > LOCK_TIMEOUT:
+        lock.unlink(missing_ok=True)
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        return
+
+    def rebuild():
+        try:
+            build_snapshot()
+        except Exception:
+            logger.exception('Listing snapshot rebuild failed')
+        finally:
+            lock.unlink(missing_ok=True)
+            connection.close()
+
+    if background:
+        threading.Thread(target=rebuild, name='listing-snapshot-rebuild', daemon=True).start()
+    else:
+        rebuild()
+
+
+def warm():
+    # Runs in the gunicorn master, whose threads the forked workers don't
+    # inherit, so a missing or stale snapshot is built in the foreground
+    if current_snapshot(background=False) is None:
+        current_snapshot(background=False)
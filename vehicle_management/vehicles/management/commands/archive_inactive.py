@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from vehicles import archive
+
+
+class Command(BaseCommand):
+    help = 'Move long soft-deleted vehicles, their images and gallery images into archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_RETENTION_DAYS,
+                            help='Archive rows inactive for more than this many days')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.5, help='Seconds to pause between batches')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches per table')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be archived')
+        parser.add_argument('--restore-vehicle', type=int, nargs='+', metavar='ID',
+                            help='Restore archived vehicles (with their images) instead of archiving')
+        parser.add_argument('--restore-gallery', type=int, nargs='+', metavar='ID',
+                            help='Restore archived gallery images instead of archiving')
+        parser.add_argument('--activate', action='store_true', help='Mark restored rows active again')
+
+    def handle(self, *args, **options):
+        if options['restore_vehicle'] or options['restore_gallery']:
+            self.restore(options)
+            return
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if options['dry_run']:
+            for label, count in archive.pending_counts(options['days']).items():
+                self.stdout.write(f"{label}: {count} rows would be archived")
+            return
+
+        for name, run in (('vehicles', archive.archive_vehicles), ('gallery', archive.archive_gallery)):
+            totals = {}
+            for batches, totals in run(options['days'], options['batch_size'], options['sleep'], options['max_batches']):
+                self.stdout.write(f"{name} batch {batches}: {totals}")
+            self.stdout.write(self.style.SUCCESS(f"Archived {name}: {totals or 'nothing to do'}"))
+
+    def restore(self, options):
+        if options['restore_vehicle']:
+            moved = archive.restore_vehicles(options['restore_vehicle'], options['activate'])
+            self.stdout.write(self.style.SUCCESS(f"Restored vehicles: {moved or 'none found in archive'}"))
+        if options['restore_gallery']:
+            moved = archive.restore_gallery(options['restore_gallery'], options['activate'])
+            self.stdout.write(self.style.SUCCESS(f"Restored gallery images: {moved or 'none found in archive'}"))
@@ -0,0 +1,56 @@
+import io
+import time
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+from vehicles.dedup import METADATA_FIELDS, index_asset
+from vehicles.image_metadata import analyse_image
+from vehicles.models import Gallery, VehicleImage
+
+
+class Command(BaseCommand):
+    help = ('Record dimensions, color and placeholder for images uploaded before metadata was stored, '
+            'and add them to the duplicate upload index')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Rows updated per query')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many images per table')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds to wait for each download')
+
+    def handle(self, *args, **options):
+        for model in (VehicleImage, Gallery):
+            updated, failed = self.backfill(model, options)
+            self.stdout.write(self.style.SUCCESS(
+                f"{model._meta.verbose_name_plural}: {updated} updated, {failed} failed"
+            ))
+
+    def backfill(self, model, options):
+        pending = model.objects.filter(width__isnull=True).exclude(image='').order_by('id')
+        if options['limit']:
+            pending = pending[:options['limit']]
+
+        updated = failed = 0
+        batch = []
+        for image in pending.iterator(chunk_size=options['batch_size']):
+            try:
+                with urlopen(image.image.url, timeout=options['timeout']) as response:
+                    data = io.BytesIO(response.read())
+                metadata, phash = analyse_image(data)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"  {model.__name__} #{image.id}: {exc}")
+                continue
+            for field, value in metadata.items():
+                setattr(image, field, value)
+            index_asset(image.image, metadata, phash)
+            batch.append(image)
+            if len(batch) == options['batch_size']:
+                model.objects.bulk_update(batch, METADATA_FIELDS)
+                updated += len(batch)
+                batch = []
+                time.sleep(options['sleep'])
+        if batch:
+            model.objects.bulk_update(batch, METADATA_FIELDS)
+            updated += len(batch)
+        return updated, failed
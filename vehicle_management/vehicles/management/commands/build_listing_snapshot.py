@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from vehicles.listing_snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the memory-mapped snapshot of active listings used by the vehicle list'
+
+    def handle(self, *args, **options):
+        meta = build_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Published listing snapshot {meta['version']} with {meta['count']} vehicles"
+        ))
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from vehicles.asset_gc import collect_orphans, get_storage
+
+
+class Command(BaseCommand):
+    help = ('Delete stored image assets that no vehicle image or gallery row references, '
+            'or only rows of listings deleted or archived more than --retention-days ago')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report orphans without deleting them')
+        parser.add_argument('--prefix', default=None, help='Only consider public_ids starting with this prefix')
+        parser.add_argument('--min-age-hours', type=float, default=24,
+                            help='Never delete assets uploaded more recently than this')
+        parser.add_argument('--retention-days', type=int, default=settings.ASSET_RETENTION_DAYS,
+                            help='Release assets of listings deleted or archived longer ago than this (0: never)')
+        parser.add_argument('--rate', type=float, default=1.0, help='Bulk delete calls per second')
+        parser.add_argument('--storage', default=None, help='Dotted path of the storage backend class')
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] > 1
+
+        def on_orphan(asset):
+            if verbose or options['dry_run']:
+                self.stdout.write(f"  orphan {asset.public_id} ({asset.bytes} bytes, {asset.created_at:%Y-%m-%d})")
+
+        report = collect_orphans(
+            storage=get_storage(options['storage']),
+            dry_run=options['dry_run'],
+            prefix=options['prefix'],
+            min_age=timedelta(hours=options['min_age_hours']),
+            deletes_per_second=options['rate'],
+            on_orphan=on_orphan,
+            retention=timedelta(days=options['retention_days']) if options['retention_days'] else None,
+        )
+
+        megabytes = report.orphaned_bytes / (1024 * 1024)
+        self.stdout.write(
+            f"Scanned {report.scanned} assets: {report.orphaned} orphaned ({megabytes:.1f} MB), "
+            f"{report.too_recent} unreferenced but inside the grace period, "
+            f"{report.released_rows} image rows of long-deleted listings released with them"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: nothing deleted'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {report.deleted} assets, {report.failed} failed"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from vehicles.dedup import savings
+from vehicles.models import ImageAsset
+
+
+class Command(BaseCommand):
+    help = 'Report uploads skipped and storage saved by duplicate image detection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='List this many of the most reused images')
+
+    def handle(self, *args, **options):
+        report = savings()
+        megabytes = report['bytes_saved'] / (1024 * 1024)
+        stored = report['bytes_stored'] / (1024 * 1024)
+        self.stdout.write(f"Indexed images: {report['assets']} ({stored:.1f} MB)")
+        self.stdout.write(f"Images reused at least once: {report['reused_assets']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Uploads skipped: {report['uploads_skipped']}, saving {megabytes:.1f} MB of uploads and storage"
+        ))
+
+        if options['top'] and report['reused_assets']:
+            self.stdout.write('Most reused:')
+            for asset in ImageAsset.objects.filter(reuse_count__gt=0).order_by('-reuse_count')[:options['top']]:
+                self.stdout.write(f"  {asset.public_id}: {asset.reuse_count} reuses, {asset.bytes_saved} bytes")
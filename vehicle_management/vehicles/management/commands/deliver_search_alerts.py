@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from vehicles.saved_searches import deliver_pending, get_delivery
+
+
+class Command(BaseCommand):
+    help = 'Send pending saved search alerts from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Alerts claimed per transaction')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds between polls with --loop')
+        parser.add_argument('--delivery', default=None, help='Dotted path of the delivery class')
+
+    def handle(self, *args, **options):
+        delivery = get_delivery(options['delivery'])
+        total = 0
+        while True:
+            delivered, claimed = deliver_pending(delivery, options['batch_size'])
+            total += delivered
+            if delivered:
+                self.stdout.write(f"  delivered {delivered} of {claimed} alerts")
+            # A short or entirely failed batch means the outbox is drained for now
+            if claimed < options['batch_size'] or not delivered:
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Delivered {total} alerts"))
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:27
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+MILEAGE_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k\b)?', re.IGNORECASE)
+
+
+def populate_mileage_value(apps, schema_editor):
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    batch = []
+    for vehicle in Vehicle.objects.only('id', 'mileage').iterator(chunk_size=2000):
+        match = MILEAGE_RE.search(vehicle.mileage or '')
+        if match:
+            value = float(match.group(1).replace(',', ''))
+            value = int(value * 1000 if match.group(2) else value)
+            # Larger values do not fit the column; 0012 leaves them NULL too
+            if value <= 2147483647:
+                vehicle.mileage_value = value
+                batch.append(vehicle)
+        if len(batch) >= 2000:
+            Vehicle.objects.bulk_update(batch, ['mileage_value'])
+            batch = []
+    Vehicle.objects.bulk_update(batch, ['mileage_value'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0004_alter_vehicle_body_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='mileage_value',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_mileage_value, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='vehicle_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price', 'id'], name='vehicle_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['year', 'id'], name='vehicle_active_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['mileage_value', 'id'], name='vehicle_active_mileage_idx'),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:31
+
+import cloudinary.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0005_vehicle_list_orderings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedGallery',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(blank=True, max_length=200, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('image', cloudinary.models.CloudinaryField(max_length=255, verbose_name='image')),
+                ('uploaded_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_active', models.BooleanField(default=False)),
+                ('archived_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Gallery Image',
+                'verbose_name_plural': 'Archived Gallery Images',
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedVehicle',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('year', models.IntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fuel_type', models.CharField(choices=[('petrol', 'Petrol'), ('diesel', 'Diesel'), ('electric', 'Electric'), ('hybrid', 'Hybrid'), ('hybrid_electric', 'Hybrid Electric'), ('gas', 'Gas')], max_length=20)),
+                ('transmission', models.CharField(choices=[('manual', 'Manual'), ('automatic', 'Automatic'), ('cvt', 'CVT')], max_length=15)),
+                ('mileage', models.CharField(max_length=50)),
+                ('mileage_value', models.PositiveIntegerField(blank=True, null=True)),
+                ('body_type', models.CharField(max_length=50)),
+                ('color', models.CharField(max_length=50)),
+                ('engine', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('features', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_active', models.BooleanField(default=False)),
+                ('archived_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedVehicleImage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('image', cloudinary.models.CloudinaryField(max_length=255, verbose_name='image')),
+                ('is_primary', models.BooleanField(default=False)),
+                ('uploaded_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-is_primary', 'uploaded_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='gallery',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='gallery',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['uploaded_at', 'id'], name='gallery_active_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gallery',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['updated_at'], name='gallery_inactive_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['updated_at'], name='vehicle_inactive_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedgallery',
+            name='uploaded_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_gallery_images', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedvehicle',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_vehicles', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedvehicleimage',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='vehicles.archivedvehicle'),
+        ),
+    ]
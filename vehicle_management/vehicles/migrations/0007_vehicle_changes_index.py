@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0006_archive_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['updated_at', 'id'], name='vehicle_updated_idx'),
+        ),
+    ]
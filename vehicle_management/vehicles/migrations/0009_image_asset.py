@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:48
+
+import cloudinary.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0008_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('file_size', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('image_format', models.CharField(blank=True, editable=False, max_length=10)),
+                ('dominant_color', models.CharField(blank=True, editable=False, max_length=7)),
+                ('placeholder', models.CharField(blank=True, editable=False, max_length=64)),
+                ('image', cloudinary.models.CloudinaryField(max_length=255, verbose_name='image')),
+                ('public_id', models.CharField(max_length=255, unique=True)),
+                ('phash', models.BigIntegerField()),
+                ('phash_band0', models.PositiveIntegerField(db_index=True)),
+                ('phash_band1', models.PositiveIntegerField(db_index=True)),
+                ('phash_band2', models.PositiveIntegerField(db_index=True)),
+                ('phash_band3', models.PositiveIntegerField(db_index=True)),
+                ('reuse_count', models.PositiveIntegerField(default=0)),
+                ('bytes_saved', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_reused_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0010_saved_searches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedvehicle',
+            name='is_featured',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='is_featured',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_featured', True)), fields=['created_at', 'id'], name='vehicle_featured_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:12
+
+import re
+
+from django.db import migrations
+
+MILEAGE_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k\b)?\s*(km|kilomet)?', re.IGNORECASE)
+
+
+def parse_mileage(mileage):
+    # Frozen copy of vehicles.models.parse_mileage
+    match = MILEAGE_RE.search(mileage or '')
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', ''))
+    if match.group(2):
+        value *= 1000
+    if match.group(3):
+        value *= 0.621371
+    if value > 2147483647:
+        return None
+    return int(value)
+
+
+def convert_mileage_value(apps, schema_editor):
+    """
+    Recompute mileage_value in miles, for listings given in kilometres
+    """
+    for model_name in ('Vehicle', 'ArchivedVehicle'):
+        model = apps.get_model('vehicles', model_name)
+        batch = []
+        for vehicle in model.objects.only('id', 'mileage', 'mileage_value').iterator(chunk_size=2000):
+            value = parse_mileage(vehicle.mileage)
+            if value != vehicle.mileage_value:
+                vehicle.mileage_value = value
+                batch.append(vehicle)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['mileage_value'])
+                batch = []
+        model.objects.bulk_update(batch, ['mileage_value'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0011_homepage_featured'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_mileage_value, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,33 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
 from cloudinary.models import CloudinaryField
 import json
+import re
 
 User = get_user_model()
 
+MILEAGE_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k\b)?\s*(km|kilomet)?', re.IGNORECASE)
+MILES_PER_KM = 0.621371
+MAX_MILEAGE_VALUE = 2147483647  # PositiveIntegerField's upper bound on every backend
+
+def parse_mileage(mileage):
+    """
+    Mileage in miles from free text, e.g. "60,000 miles" -> 60000, "45k km" -> 27961.
+    None if there is no number, or it is too large to be a real mileage
+    """
+    match = MILEAGE_RE.search(mileage or '')
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', ''))
+    if match.group(2):
+        value *= 1000
+    if match.group(3):
+        value *= MILES_PER_KM
+    if value > MAX_MILEAGE_VALUE:
+        return None
+    return int(value)
+
 class Vehicle(models.Model):
     FUEL_TYPE_CHOICES = [
         ('petrol', 'Petrol'),
@@ -27,6 +50,7 @@ class Vehicle(models.Model):
     fuel_type = models.CharField(max_length=20, choices=FUEL_TYPE_CHOICES)
     transmission = models.CharField(max_length=15, choices=TRANSMISSION_CHOICES)
     mileage = models.CharField(max_length=50)  # e.g., "60,000 miles"
+    mileage_value = models.PositiveIntegerField(null=True, blank=True, editable=False)  # Parsed from mileage, in miles, for sorting
     body_type = models.CharField(max_length=50)  # Users can manually enter any body type
     color = models.CharField(max_length=50)
     engine = models.CharField(max_length=100)
@@ -36,14 +60,91 @@ class Vehicle(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    is_featured = models.BooleanField(default=False)  # Set by admins; shown on the homepage
     
     class Meta:
         ordering = ['-created_at']
+        # One index per ?ordering= key on the vehicle list, limited to live rows
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True), name='vehicle_active_created_idx'),
+            models.Index(fields=['price', 'id'], condition=models.Q(is_active=True), name='vehicle_active_price_idx'),
+            models.Index(fields=['year', 'id'], condition=models.Q(is_active=True), name='vehicle_active_year_idx'),
+            models.Index(fields=['mileage_value', 'id'], condition=models.Q(is_active=True), name='vehicle_active_mileage_idx'),
+            # Change feed order, including soft-deleted rows (see vehicles.changes)
+            models.Index(fields=['updated_at', 'id'], name='vehicle_updated_idx'),
+            # Soft-deleted rows waiting for archival (see vehicles.archive)
+            models.Index(fields=['updated_at'], condition=models.Q(is_active=False), name='vehicle_inactive_updated_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True, is_featured=True), name='vehicle_featured_idx'),
+        ]
         
     def __str__(self):
         return f"{self.title} ({self.year})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember loaded values so signals can tell what a save changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self.mileage_value = parse_mileage(self.mileage)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'mileage' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'mileage_value'}
+        super().save(*args, **kwargs)
+
+class ImageMetadata(models.Model):
+    """
+    Dimensions and placeholder data recorded when an image is uploaded
+    """
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    file_size = models.PositiveIntegerField(null=True, blank=True, editable=False)  # Bytes
+    image_format = models.CharField(max_length=10, blank=True, editable=False)
+    dominant_color = models.CharField(max_length=7, blank=True, editable=False)  # e.g. "#a1b2c3"
+    placeholder = models.CharField(max_length=64, blank=True, editable=False)  # BlurHash
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        upload = None
+        # The image is still a local file until CloudinaryField uploads it in pre_save
+        if isinstance(self.image, UploadedFile):
+            from .dedup import prepare_upload
+            upload = prepare_upload(self.image)
+            for field, value in upload.metadata.items():
+                setattr(self, field, value)
+            if upload.asset is not None:
+                # Same photo is already stored: point at it and skip the upload
+                self.image = upload.asset.image
+        super().save(*args, **kwargs)
+        if upload is not None:
+            from .dedup import record_upload
+            record_upload(self.image, upload)
+
+class ImageAsset(ImageMetadata):
+    """
+    A stored image, indexed by perceptual hash so re-uploads can reuse it
+    """
+    image = CloudinaryField('image')
+    public_id = models.CharField(max_length=255, unique=True)
+    phash = models.BigIntegerField()  # 64-bit pHash, stored signed
+    # 16-bit slices of phash; near matches share at least one (see dedup.py)
+    phash_band0 = models.PositiveIntegerField(db_index=True)
+    phash_band1 = models.PositiveIntegerField(db_index=True)
+    phash_band2 = models.PositiveIntegerField(db_index=True)
+    phash_band3 = models.PositiveIntegerField(db_index=True)
+    reuse_count = models.PositiveIntegerField(default=0)  # Uploads skipped
+    bytes_saved = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_reused_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return self.public_id
 
-class VehicleImage(models.Model):
+class VehicleImage(ImageMetadata):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='images')
     image = CloudinaryField('image')
     is_primary = models.BooleanField(default=False)
@@ -53,7 +154,10 @@ class VehicleImage(models.Model):
         ordering = ['-is_primary', 'uploaded_at']
         
     def __str__(self):
-        return f"Image for {self.vehicle.title}"
+        # Don't fetch the vehicle just to print an image (one query per row in lists)
+        if VehicleImage.vehicle.is_cached(self):
+            return f"Image for {self.vehicle.title}"
+        return f"Image for vehicle #{self.vehicle_id}"
     
     def save(self, *args, **kwargs):
         # Ensure only one primary image per vehicle
@@ -63,18 +167,133 @@ class VehicleImage(models.Model):
 
 
 
-class Gallery(models.Model):
+class Gallery(ImageMetadata):
     title = models.CharField(max_length=200, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     image = CloudinaryField('image')
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gallery_images')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
     class Meta:
         ordering = ['-uploaded_at']
         verbose_name = 'Gallery Image'
         verbose_name_plural = 'Gallery Images'
+        indexes = [
+            models.Index(fields=['uploaded_at', 'id'], condition=models.Q(is_active=True), name='gallery_active_uploaded_idx'),
+            models.Index(fields=['updated_at'], condition=models.Q(is_active=False), name='gallery_inactive_updated_idx'),
+        ]
         
     def __str__(self):
         return f"Gallery Image: {self.title or 'Untitled'} - {self.uploaded_at.strftime('%Y-%m-%d')}"
+
+
+class SavedSearch(models.Model):
+    """
+    A buyer's vehicle list filters, matched against new listings
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    params = models.JSONField(default=dict)  # Same keys as the vehicle list query parameters
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Matchers in every worker poll for searches changed since their last sync
+            models.Index(fields=['updated_at'], name='savedsearch_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.name or self.params}"
+
+class SearchAlert(models.Model):
+    """
+    Outbox of new listings that matched a saved search, awaiting delivery
+    """
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='alerts')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='search_alerts')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_alerts')
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'vehicle'], name='searchalert_unique_match'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='searchalert_user_idx'),
+            models.Index(fields=['id'], condition=models.Q(delivered_at__isnull=True), name='searchalert_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Alert for {self.user} on vehicle #{self.vehicle_id}"
+
+
+# Archive tables for soft-deleted rows moved out of the hot tables by
+# vehicles.archive. Rows keep their original ids and timestamps so they can be
+# restored unchanged.
+
+class ArchivedVehicle(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    year = models.IntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    fuel_type = models.CharField(max_length=20, choices=Vehicle.FUEL_TYPE_CHOICES)
+    transmission = models.CharField(max_length=15, choices=Vehicle.TRANSMISSION_CHOICES)
+    mileage = models.CharField(max_length=50)
+    mileage_value = models.PositiveIntegerField(null=True, blank=True)
+    body_type = models.CharField(max_length=50)
+    color = models.CharField(max_length=50)
+    engine = models.CharField(max_length=100)
+    description = models.TextField()
+    features = models.JSONField(default=list)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_vehicles')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=False)
+    is_featured = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-archived_at']
+
+    def __str__(self):
+        return f"Archived: {self.title} ({self.year})"
+
+class ArchivedVehicleImage(ImageMetadata):
+    id = models.BigIntegerField(primary_key=True)
+    vehicle = models.ForeignKey(ArchivedVehicle, on_delete=models.CASCADE, related_name='images')
+    image = CloudinaryField('image')
+    is_primary = models.BooleanField(default=False)
+    uploaded_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-is_primary', 'uploaded_at']
+
+    def __str__(self):
+        return f"Archived image {self.id} for vehicle {self.vehicle_id}"
+
+class ArchivedGallery(ImageMetadata):
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    image = CloudinaryField('image')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_gallery_images')
+    uploaded_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-archived_at']
+        verbose_name = 'Archived Gallery Image'
+        verbose_name_plural = 'Archived Gallery Images'
+
+    def __str__(self):
+        return f"Archived Gallery Image: {self.title or 'Untitled'}"
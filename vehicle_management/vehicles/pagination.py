@@ -0,0 +1,109 @@
+"""
+Pagination with cheap counts for large result sets.
+
+Below settings.APPROXIMATE_COUNT_THRESHOLD rows the count is exact, and exact
+counts are cached per normalized query for settings.COUNT_CACHE_TTL seconds,
+or until a vehicle or gallery image changes (invalidate_counts()).
+Above it, on PostgreSQL, the planner's row estimate is used instead of
+COUNT(*), and the response says so with "count_is_approximate".
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from vehicle_management.cache_backends import invalidate_namespace, namespaced_key
+
+COUNT_NAMESPACE = 'pagination:count'
+
+
+def planner_estimate(queryset):
+    """
+    Row estimate from EXPLAIN, or None when the database can't provide one
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _cache_key(queryset):
+    # The compiled SQL is the normalized filter: parameter order and
+    # formatting in the URL don't matter, and ordering is dropped.
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    digest = hashlib.sha1(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+    return namespaced_key(COUNT_NAMESPACE, digest)
+
+
+def invalidate_counts():
+    invalidate_namespace(COUNT_NAMESPACE)
+
+
+def count_rows(object_list):
+    """
+    Return (count, is_approximate) for a queryset or any sized sequence
+    """
+    if not isinstance(object_list, QuerySet):
+        return len(object_list), False
+
+    key = _cache_key(object_list)
+    count = cache.get(key)
+    if count is not None:
+        return count, False
+
+    estimate = planner_estimate(object_list)
+    if estimate is not None and estimate > settings.APPROXIMATE_COUNT_THRESHOLD:
+        return estimate, True
+
+    # Concurrent requests for the same uncached count run one COUNT(*)
+    return cache.get_or_set(key, object_list.count, settings.COUNT_CACHE_TTL), False
+
+
+class EstimatedCountPaginator(Paginator):
+
+    @cached_property
+    def _count_result(self):
+        return count_rows(self.object_list)
+
+    @cached_property
+    def count(self):
+        return self._count_result[0]
+
+    @property
+    def count_is_approximate(self):
+        return self._count_result[1]
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    PageNumberPagination that avoids COUNT(*) on large result sets
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_approximate': self.page.paginator.count_is_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_approximate'] = {'type': 'boolean', 'example': False}
+        return response_schema
@@ -0,0 +1,321 @@
+"""
+Saved search matching for new listings.
+
+Every active SavedSearch is compiled into an in-memory index:
+
+- an inverted index per enum field (fuel_type, body_type, transmission)
+  from value to the searches requiring it, plus the searches that leave
+  the field open;
+- for price and year, the searches' lower and upper bounds as sorted
+  arrays, so "lower bound <= x" is a prefix of one and "upper bound >= x" a
+  suffix of the other, found with a binary search.
+
+A new vehicle is matched by taking the smallest of those candidate sets
+(each sized in O(log n)) and checking the remaining constraints on just
+those rows, vectorized. Free-text `search` terms are checked last, on the
+few survivors. Matches go into the SearchAlert outbox in one insert, and
+deliver_search_alerts sends them.
+
+The index is loaded once per process and picks up searches changed in
+other workers with one indexed query before each match. Every
+SAVED_SEARCH_INDEX_MAX_AGE seconds it is reloaded from scratch in a
+background thread, while the current index keeps serving matches.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import SavedSearch, SearchAlert
+
+logger = logging.getLogger(__name__)
+
+ENUM_FIELDS = ('fuel_type', 'body_type', 'transmission')
+RANGE_FIELDS = (('price', 'min_price', 'max_price'), ('year', 'min_year', 'max_year'))
+# Haystack for `search`, as in filter_vehicles
+SEARCH_FIELDS = ('title', 'description', 'color', 'fuel_type', 'body_type')
+
+ANY = -1
+EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def compile_params(params):
+    """
+    Constraints for a saved search: enum values, (low, high) ranges and a
+    lowercase search term, with None where the search leaves a field open
+    """
+    enums = {field: params.get(field) or None for field in ENUM_FIELDS}
+    ranges = {}
+    for field, low, high in RANGE_FIELDS:
+        ranges[field] = (
+            float(params[low]) if params.get(low) not in (None, '') else -np.inf,
+            float(params[high]) if params.get(high) not in (None, '') else np.inf,
+        )
+    search = (params.get('search') or '').lower() or None
+    return enums, ranges, search
+
+
+class SavedSearchIndex:
+    """
+    Matches a vehicle against every active saved search
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()  # Held while a reload runs
+        self._searches = {}  # saved search id -> (user id, compiled params)
+        self._arrays = None  # Built from _searches on the next match after a change
+        self.built_at = None
+        self.synced_at = None
+
+    def _build(self):
+        ids = list(self._searches)
+        n = len(ids)
+        arrays = {
+            'ids': np.array(ids, dtype=np.int64),
+            'users': np.array([self._searches[i][0] for i in ids], dtype=np.int64),
+            'codes': {},
+            'postings': {},
+            'open': {},
+            'terms': [self._searches[i][1][2] for i in ids],
+        }
+        arrays['has_term'] = np.array([term is not None for term in arrays['terms']], dtype=bool)
+        for field in ENUM_FIELDS:
+            values = {}
+            codes = np.full(n, ANY, dtype=np.int32)
+            for row, search_id in enumerate(ids):
+                value = self._searches[search_id][1][0][field]
+                if value is not None:
+                    codes[row] = values.setdefault(value, len(values))
+            order = np.argsort(codes, kind='stable')
+            sorted_codes = codes[order]
+            postings = {}
+            for value, code in values.items():
+                start, end = np.searchsorted(sorted_codes, [code, code + 1])
+                postings[value] = order[start:end]
+            arrays['codes'][field] = (values, codes)
+            arrays['postings'][field] = postings
+            arrays['open'][field] = order[:np.searchsorted(sorted_codes, ANY + 1)]
+        for field, _, _ in RANGE_FIELDS:
+            lows = np.array([self._searches[i][1][1][field][0] for i in ids], dtype=np.float64)
+            highs = np.array([self._searches[i][1][1][field][1] for i in ids], dtype=np.float64)
+            by_low = np.argsort(lows, kind='stable')
+            by_high = np.argsort(highs, kind='stable')
+            arrays[field] = (lows, highs, by_low, lows[by_low], by_high, highs[by_high])
+        self._arrays = arrays
+
+    def _apply(self, rows):
+        changed = False
+        for search_id, user_id, params, is_active in rows:
+            entry = (user_id, compile_params(params)) if is_active else None
+            if self._searches.get(search_id) != entry:
+                if entry is None:
+                    self._searches.pop(search_id, None)
+                else:
+                    self._searches[search_id] = entry
+                changed = True
+        if changed:
+            self._arrays = None
+
+    def rebuild(self):
+        """
+        Reload every active saved search from the database
+        """
+        synced_at = timezone.now()
+        rows = SavedSearch.objects.filter(is_active=True).values_list('id', 'user_id', 'params', 'is_active')
+        # Built aside, so matches keep using the current index meanwhile
+        fresh = SavedSearchIndex()
+        fresh._apply(rows.iterator(chunk_size=5000))
+        fresh._build()
+        with self._lock:
+            self._searches = fresh._searches
+            self._arrays = fresh._arrays
+            self.built_at = time.monotonic()
+            # Searches synced into the old index during the reload are read again
+            self.synced_at = synced_at
+
+    def rebuild_in_background(self):
+        if not self._rebuild_lock.acquire(blocking=False):
+            return  # Already rebuilding
+
+        def rebuild():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception('Saved search index rebuild failed')
+            finally:
+                self._rebuild_lock.release()
+                connection.close()
+
+        threading.Thread(target=rebuild, name='saved-search-rebuild', daemon=True).start()
+
+    def sync(self):
+        """
+        Pick up searches saved by any worker since the last sync
+        """
+        if self.built_at is None:
+            self.rebuild()
+            return
+        if time.monotonic() - self.built_at > settings.SAVED_SEARCH_INDEX_MAX_AGE:
+            self.rebuild_in_background()
+        # Overlap so rows from transactions still committing at the last sync aren't missed
+        since = self.synced_at - timedelta(seconds=settings.CHANGES_FEED_LAG)
+        synced_at = timezone.now()
+        rows = list(SavedSearch.objects.filter(updated_at__gte=since)
+                    .values_list('id', 'user_id', 'params', 'is_active'))
+        with self._lock:
+            self._apply(rows)
+            self.synced_at = synced_at
+
+    def __len__(self):
+        return len(self._searches)
+
+    def match(self, vehicle):
+        """
+        (saved search id, user id) pairs for every active search the vehicle matches
+        """
+        with self._lock:
+            if self._arrays is None:
+                self._build()
+            arrays = self._arrays
+        n = len(arrays['ids'])
+        if n == 0:
+            return []
+
+        # Candidate generators, each sized without materializing it
+        enum_values = {field: getattr(vehicle, field) for field in ENUM_FIELDS}
+        range_values = {'price': float(vehicle.price), 'year': float(vehicle.year)}
+        options = []
+        for field, value in enum_values.items():
+            posting = arrays['postings'][field].get(value, EMPTY)
+            open_rows = arrays['open'][field]
+            options.append((len(posting) + len(open_rows),
+                            lambda posting=posting, open_rows=open_rows: np.concatenate([posting, open_rows])))
+        for field, value in range_values.items():
+            _, _, by_low, sorted_lows, by_high, sorted_highs = arrays[field]
+            low_count = int(np.searchsorted(sorted_lows, value, side='right'))  # low <= value
+            high_start = int(np.searchsorted(sorted_highs, value, side='left'))  # high >= value
+            options.append((low_count, lambda by_low=by_low, k=low_count: by_low[:k]))
+            options.append((n - high_start, lambda by_high=by_high, k=high_start: by_high[k:]))
+        size, generate = min(options, key=lambda option: option[0])
+        if size == 0:
+            return []
+        rows = generate()
+
+        # Check every constraint on the candidates only
+        keep = np.ones(len(rows), dtype=bool)
+        for field, value in enum_values.items():
+            values, codes = arrays['codes'][field]
+            row_codes = codes[rows]
+            keep &= (row_codes == ANY) | (row_codes == values.get(value, -2))
+        for field, value in range_values.items():
+            lows, highs = arrays[field][:2]
+            keep &= (lows[rows] <= value) & (highs[rows] >= value)
+        rows = rows[keep]
+
+        # Only the few searches with a text term need a per-row check
+        with_term = rows[arrays['has_term'][rows]]
+        rows = rows[~arrays['has_term'][rows]]
+        if len(with_term):
+            haystack = [str(getattr(vehicle, field) or '').lower() for field in SEARCH_FIELDS]
+            found = [row for row in with_term.tolist()
+                     if any(arrays['terms'][row] in text for text in haystack)]
+            rows = np.concatenate([rows, np.array(found, dtype=rows.dtype)])
+        return list(zip(arrays['ids'][rows].tolist(), arrays['users'][rows].tolist()))
+
+
+index = SavedSearchIndex()
+
+
+def warm():
+    index.rebuild()
+
+
+def notify_matches(vehicle):
+    """
+    Queue alerts for every saved search a new listing matches
+    """
+    if not vehicle.is_active:
+        return 0
+    index.sync()
+    alerts = [
+        SearchAlert(saved_search_id=search_id, vehicle_id=vehicle.id, user_id=user_id)
+        for search_id, user_id in index.match(vehicle)
+        if user_id != vehicle.created_by_id  # Sellers don't need alerts for their own listing
+    ]
+    SearchAlert.objects.bulk_create(alerts, batch_size=1000, ignore_conflicts=True)
+    return len(alerts)
+
+
+class LogAlertDelivery:
+    """
+    Writes alerts to the log; stands in for a real channel in development
+    """
+
+    def deliver(self, user, alerts):
+        for alert in alerts:
+            logger.info('Saved search %s matched vehicle %s for user %s',
+                        alert.saved_search_id, alert.vehicle_id, user.pk)
+
+
+class EmailAlertDelivery:
+    """
+    One email per user listing the new matches
+    """
+
+    def deliver(self, user, alerts):
+        if not user.email:
+            return
+        lines = [
+            f"- {alert.vehicle.title} ({alert.vehicle.year}), {alert.vehicle.price} "
+            f"[{alert.saved_search.name or 'saved search'}]"
+            for alert in alerts
+        ]
+        send_mail(
+            subject=f"{len(alerts)} new vehicle{'s' if len(alerts) != 1 else ''} match your saved searches",
+            message='\n'.join(lines),
+            from_email=None,
+            recipient_list=[user.email],
+        )
+
+
+def get_delivery(path=None):
+    return import_string(path or settings.SEARCH_ALERT_DELIVERY)()
+
+
+def deliver_pending(delivery=None, batch_size=500):
+    """
+    Send one batch of undelivered alerts, grouped by user. Returns (alerts
+    delivered, alerts claimed); alerts whose delivery failed are retried later.
+    """
+    delivery = delivery or get_delivery()
+    with transaction.atomic():
+        # skip_locked lets several delivery workers share the outbox
+        alerts = list(
+            SearchAlert.objects.filter(delivered_at__isnull=True)
+            .select_related('user', 'vehicle', 'saved_search')
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('id')[:batch_size]
+        )
+        by_user = {}
+        for alert in alerts:
+            by_user.setdefault(alert.user_id, []).append(alert)
+        delivered = []
+        for user_alerts in by_user.values():
+            try:
+                delivery.deliver(user_alerts[0].user, user_alerts)
+            except Exception:
+                logger.exception('Delivering %d alerts to user %s failed', len(user_alerts), user_alerts[0].user_id)
+                continue
+            delivered.extend(alert.id for alert in user_alerts)
+        SearchAlert.objects.filter(id__in=delivered).update(delivered_at=timezone.now())
+    return len(delivered), len(alerts)
+
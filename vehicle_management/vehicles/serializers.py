@@ -1,16 +1,23 @@
 from rest_framework import serializers
-from .models import Vehicle, VehicleImage, Gallery
+from .models import Vehicle, VehicleImage, Gallery, SavedSearch, SearchAlert
+from .direct_upload import ALLOWED_FORMATS
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Recorded at upload time (see ImageMetadata); always read-only
+IMAGE_METADATA_FIELDS = ['width', 'height', 'file_size', 'image_format', 'dominant_color', 'placeholder']
+
+def image_metadata(image):
+    return {field: getattr(image, field) for field in IMAGE_METADATA_FIELDS}
+
 class VehicleImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     
     class Meta:
         model = VehicleImage
-        fields = ['id', 'image', 'image_url', 'is_primary', 'uploaded_at']
-        read_only_fields = ['id', 'uploaded_at']
+        fields = ['id', 'image', 'image_url', 'is_primary', 'uploaded_at', *IMAGE_METADATA_FIELDS]
+        read_only_fields = ['id', 'uploaded_at', *IMAGE_METADATA_FIELDS]
     
     def get_image_url(self, obj):
         if obj.image:
@@ -79,6 +86,7 @@ class VehicleSerializer(serializers.ModelSerializer):
 class VehicleListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing vehicles"""
     primary_image = serializers.SerializerMethodField()
+    primary_image_metadata = serializers.SerializerMethodField()
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
     
     class Meta:
@@ -86,17 +94,63 @@ class VehicleListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'year', 'price', 'fuel_type', 'transmission',
             'mileage', 'body_type', 'color', 'description', 'primary_image',
-            'created_by_username', 'created_at'
+            'primary_image_metadata', 'created_by_username', 'created_at'
         ]
     
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            return primary_image.image.url
-        elif obj.images.exists():
-            return obj.images.first().image.url
+        # Images are ordered primary-first, and all() reuses prefetched rows
+        for image in obj.images.all():
+            return image.image.url
+        return None
+    
+    def get_primary_image_metadata(self, obj):
+        for image in obj.images.all():
+            return image_metadata(image)
         return None
     
+class VehicleBulkChangesSerializer(serializers.ModelSerializer):
+    """Fields an owner may change across many vehicles at once"""
+    
+    class Meta:
+        model = Vehicle
+        fields = [
+            'title', 'year', 'price', 'fuel_type', 'transmission',
+            'mileage', 'body_type', 'color', 'engine', 'description',
+            'features', 'is_active'
+        ]
+        extra_kwargs = {field: {'required': False} for field in fields}
+    
+    def to_internal_value(self, data):
+        unknown = set(data) - set(self.fields) if isinstance(data, dict) else set()
+        if unknown:
+            raise serializers.ValidationError({field: 'This field cannot be bulk updated.' for field in sorted(unknown)})
+        return super().to_internal_value(data)
+    
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('No changes given.')
+        return attrs
+
+class VehicleBulkUpdateSerializer(serializers.Serializer):
+    """Apply the same changes to a list of the caller's vehicles"""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500)
+    changes = VehicleBulkChangesSerializer()
+    
+class DirectUploadSerializer(serializers.Serializer):
+    """Options for a vehicle image uploaded straight to storage"""
+    is_primary = serializers.BooleanField(default=False)
+    
+class DirectUploadConfirmSerializer(serializers.Serializer):
+    """Storage's upload response, passed back with the upload token"""
+    upload_token = serializers.CharField()
+    public_id = serializers.CharField(max_length=255)
+    version = serializers.IntegerField(min_value=1)
+    signature = serializers.CharField(max_length=128)
+    format = serializers.ChoiceField(choices=ALLOWED_FORMATS)
+    # Gallery uploads only
+    title = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    description = serializers.CharField(required=False, allow_blank=True)
+    
 class GallerySerializer(serializers.ModelSerializer):
     """Serializer for standalone gallery images (not attached to vehicles)"""
     image_url = serializers.SerializerMethodField()
@@ -104,8 +158,9 @@ class GallerySerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Gallery
-        fields = ['id', 'title', 'description', 'image', 'image_url', 'uploaded_by', 'uploaded_by_username', 'uploaded_at', 'is_active']
-        read_only_fields = ['id', 'uploaded_by', 'uploaded_at', 'is_active']
+        fields = ['id', 'title', 'description', 'image', 'image_url', 'uploaded_by', 'uploaded_by_username', 'uploaded_at', 'is_active',
+                  *IMAGE_METADATA_FIELDS]
+        read_only_fields = ['id', 'uploaded_by', 'uploaded_at', 'is_active', *IMAGE_METADATA_FIELDS]
     
     def get_image_url(self, obj):
         if obj.image:
@@ -116,4 +171,50 @@ class GallerySerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         validated_data['uploaded_by'] = request.user
         validated_data['is_active'] = True
-        return super().create(validated_data) 
\ No newline at end of file
+        return super().create(validated_data)
+
+class SavedSearchParamsSerializer(serializers.Serializer):
+    """The vehicle list query parameters a saved search can hold"""
+    search = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    fuel_type = serializers.ChoiceField(choices=Vehicle.FUEL_TYPE_CHOICES, required=False, allow_blank=True)
+    body_type = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    transmission = serializers.ChoiceField(choices=Vehicle.TRANSMISSION_CHOICES, required=False, allow_blank=True)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    min_year = serializers.IntegerField(min_value=1900, max_value=2100, required=False)
+    max_year = serializers.IntegerField(min_value=1900, max_value=2100, required=False)
+    
+    def validate(self, attrs):
+        unknown = set(self.initial_data) - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError(f"Unsupported search parameters: {', '.join(sorted(unknown))}")
+        for low, high in (('min_price', 'max_price'), ('min_year', 'max_year')):
+            if low in attrs and high in attrs and attrs[low] > attrs[high]:
+                raise serializers.ValidationError(f"{low} must not be greater than {high}.")
+        # Stored as JSON, in the same string form as query parameters
+        params = {key: str(value) for key, value in attrs.items() if value not in (None, '')}
+        if not params:
+            raise serializers.ValidationError("Add at least one filter.")
+        return params
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    """A buyer's saved vehicle list filters"""
+    
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'params', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_params(self, value):
+        serializer = SavedSearchParamsSerializer(data=value)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+class SearchAlertSerializer(serializers.ModelSerializer):
+    """A new listing that matched one of the user's saved searches"""
+    saved_search_name = serializers.CharField(source='saved_search.name', read_only=True)
+    vehicle = VehicleListSerializer(read_only=True)
+    
+    class Meta:
+        model = SearchAlert
+        fields = ['id', 'saved_search', 'saved_search_name', 'vehicle', 'created_at', 'delivered_at']
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Gallery, Vehicle, VehicleImage
+from . import events, homepage, listing_snapshot, pagination, saved_searches, similarity
+
+
+@receiver(post_save, sender=Vehicle)
+def update_similarity_index(sender, instance, **kwargs):
+    # Covers creates, edits and soft deletes (is_active=False)
+    transaction.on_commit(lambda: similarity.index.update(instance))
+    transaction.on_commit(listing_snapshot.mark_changed)
+
+
+@receiver(post_save, sender=Vehicle)
+def publish_vehicle_event(sender, instance, created, **kwargs):
+    events.publish_change(instance, created)
+
+
+@receiver(post_save, sender=Vehicle)
+def queue_saved_search_alerts(sender, instance, created, **kwargs):
+    if created:
+        # robust: a matcher failure must not fail the listing
+        transaction.on_commit(lambda: saved_searches.notify_matches(instance), robust=True)
+
+
+@receiver(post_delete, sender=Vehicle)
+def remove_from_similarity_index(sender, instance, **kwargs):
+    transaction.on_commit(lambda: similarity.index.remove(instance.id))
+    transaction.on_commit(listing_snapshot.mark_changed)
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_save, sender=VehicleImage)
+@receiver(post_delete, sender=VehicleImage)
+@receiver(post_save, sender=Gallery)
+@receiver(post_delete, sender=Gallery)
+def refresh_homepage(sender, **kwargs):
+    transaction.on_commit(homepage.schedule_rebuild)
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_save, sender=Gallery)
+@receiver(post_delete, sender=Gallery)
+def invalidate_page_counts(sender, **kwargs):
+    transaction.on_commit(pagination.invalidate_counts)
+
+
+@receiver(post_save, sender=VehicleImage)
+@receiver(post_delete, sender=VehicleImage)
+def touch_vehicle(sender, instance, **kwargs):
+    # Image changes are vehicle changes for the /vehicles/changes/ feed
+    Vehicle.objects.filter(id=instance.vehicle_id).update(updated_at=timezone.now())
+
+
+def vehicles_bulk_updated(vehicles):
+    """
+    QuerySet.bulk_update() sends no post_save, so callers pass the updated
+    vehicles here to keep the similarity index, listing snapshot and live
+    events current
+    """
+    for vehicle in vehicles:
+        events.publish_change(vehicle)
+
+    def apply():
+        for vehicle in vehicles:
+            similarity.index.update(vehicle)
+        listing_snapshot.mark_changed()
+        pagination.invalidate_counts()
+        homepage.schedule_rebuild()
+    transaction.on_commit(apply)
@@ -0,0 +1,212 @@
+"""
+In-memory "similar vehicles" index.
+
+Active vehicles are kept as compact NumPy matrices stored column by column: a
+scaled float32 (year, log price) matrix and an int32 matrix of category codes
+for fuel_type, transmission and body_type (free text, so the codes need the
+range). Signals keep the index current for saves in this process, and it is
+rebuilt from the database every SIMILAR_VEHICLES_MAX_AGE seconds to pick up
+changes made by other workers; the rebuild runs in a background thread while
+the current index keeps answering. Top-k queries are a single vectorized pass.
+"""
+
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .models import Vehicle
+
+logger = logging.getLogger(__name__)
+
+# A 5 year gap or a 1.5x price ratio each add 1.0 to the squared distance
+YEAR_SCALE = 5.0
+PRICE_SCALE = math.log(1.5)
+
+# Squared-distance penalty when a category differs
+FUEL_TYPE_WEIGHT = 1.0
+TRANSMISSION_WEIGHT = 0.5
+BODY_TYPE_WEIGHT = 1.0
+
+FIELDS = ('id', 'year', 'price', 'fuel_type', 'transmission', 'body_type')
+
+
+class SimilarityIndex:
+    """
+    Vectorized nearest-neighbour scorer over the active inventory
+    """
+
+    def __init__(self, capacity=1024):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()  # Held while a rebuild runs
+        self._replay = None  # Updates made while a rebuild loads, applied to its result
+        self._codes = {'fuel_type': {}, 'transmission': {}, 'body_type': {}}
+        self._reset(capacity)
+        self.built_at = None
+
+    def _reset(self, capacity):
+        self.size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        # One row per feature so each feature is contiguous for vectorized scans
+        self.numeric = np.zeros((2, capacity), dtype=np.float32)
+        self.categories = np.zeros((3, capacity), dtype=np.int32)
+        self.rows = {}
+
+    def _code(self, field, value):
+        codes = self._codes[field]
+        key = (value or '').strip().lower()
+        if key not in codes:
+            codes[key] = len(codes)
+        return codes[key]
+
+    def _features(self, year, price, fuel_type, transmission, body_type):
+        numeric = (year / YEAR_SCALE, math.log(max(float(price), 1.0)) / PRICE_SCALE)
+        categories = (
+            self._code('fuel_type', fuel_type),
+            self._code('transmission', transmission),
+            self._code('body_type', body_type),
+        )
+        return numeric, categories
+
+    def _grow(self):
+        capacity = max(1024, len(self.ids) * 2)
+        self.ids = np.resize(self.ids, capacity)
+        numeric = np.zeros((2, capacity), dtype=np.float32)
+        categories = np.zeros((3, capacity), dtype=np.int32)
+        numeric[:, :self.size] = self.numeric[:, :self.size]
+        categories[:, :self.size] = self.categories[:, :self.size]
+        self.numeric, self.categories = numeric, categories
+
+    def _upsert(self, vehicle_id, year, price, fuel_type, transmission, body_type):
+        row = self.rows.get(vehicle_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[vehicle_id] = row
+            self.ids[row] = vehicle_id
+        self.numeric[:, row], self.categories[:, row] = self._features(year, price, fuel_type, transmission, body_type)
+
+    def _remove(self, vehicle_id):
+        row = self.rows.pop(vehicle_id, None)
+        if row is None:
+            return
+        # Move the last row into the gap so the live rows stay contiguous
+        last = self.size - 1
+        if row != last:
+            moved_id = int(self.ids[last])
+            self.ids[row] = moved_id
+            self.numeric[:, row] = self.numeric[:, last]
+            self.categories[:, row] = self.categories[:, last]
+            self.rows[moved_id] = row
+        self.size = last
+
+    def rebuild(self):
+        """
+        Reload every active vehicle from the database
+        """
+        with self._lock:
+            self._replay = []
+        try:
+            values = list(Vehicle.objects.filter(is_active=True).values_list(*FIELDS))
+            # Built aside, so queries keep using the current index meanwhile
+            fresh = SimilarityIndex(max(1024, len(values)))
+            for vehicle_id, *fields in values:
+                fresh._upsert(vehicle_id, *fields)
+            with self._lock:
+                # The query may have missed saves made while it ran
+                for vehicle_id, fields in self._replay:
+                    if fields is None:
+                        fresh._remove(vehicle_id)
+                    else:
+                        fresh._upsert(vehicle_id, *fields)
+                self._codes = fresh._codes
+                self.size, self.ids, self.numeric, self.categories, self.rows = (
+                    fresh.size, fresh.ids, fresh.numeric, fresh.categories, fresh.rows
+                )
+                self.built_at = time.monotonic()
+        finally:
+            self._replay = None
+
+    def rebuild_in_background(self):
+        if not self._rebuild_lock.acquire(blocking=False):
+            return  # Already rebuilding
+
+        def rebuild():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception('Similar vehicles index rebuild failed')
+            finally:
+                self._rebuild_lock.release()
+                connection.close()
+
+        threading.Thread(target=rebuild, name='similarity-rebuild', daemon=True).start()
+
+    def ensure_fresh(self):
+        if self.built_at is None:
+            self.rebuild()
+        elif time.monotonic() - self.built_at > settings.SIMILAR_VEHICLES_MAX_AGE:
+            self.rebuild_in_background()
+
+    def update(self, vehicle):
+        """
+        Apply a saved or soft-deleted vehicle to the index
+        """
+        if self.built_at is None and self._replay is None:
+            return  # Not built in this process yet; the first query loads everything
+        fields = None
+        if vehicle.is_active:
+            fields = (vehicle.year, vehicle.price, vehicle.fuel_type, vehicle.transmission, vehicle.body_type)
+        with self._lock:
+            if fields is None:
+                self._remove(vehicle.id)
+            else:
+                self._upsert(vehicle.id, *fields)
+            if self._replay is not None:
+                self._replay.append((vehicle.id, fields))
+
+    def remove(self, vehicle_id):
+        with self._lock:
+            self._remove(vehicle_id)
+            if self._replay is not None:
+                self._replay.append((vehicle_id, None))
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self.rows
+
+    def similar(self, vehicle_id, k=6):
+        """
+        Return up to k (vehicle_id, distance) pairs, nearest first
+        """
+        with self._lock:
+            row = self.rows.get(vehicle_id)
+            if row is None or self.size < 2 or k < 1:
+                return []
+            n = self.size
+            years, prices = self.numeric[:, :n]
+            fuel_types, transmissions, body_types = self.categories[:, :n]
+
+            distances = np.square(years - years[row])
+            distances += np.square(prices - prices[row])
+            distances += (fuel_types != fuel_types[row]) * np.float32(FUEL_TYPE_WEIGHT)
+            distances += (transmissions != transmissions[row]) * np.float32(TRANSMISSION_WEIGHT)
+            distances += (body_types != body_types[row]) * np.float32(BODY_TYPE_WEIGHT)
+            distances[row] = np.inf
+
+            k = min(k, n - 1)
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+            return [(int(self.ids[i]), float(distances[i])) for i in nearest]
+
+
+index = SimilarityIndex()
+
+
+def warm():
+    index.rebuild()
@@ -1,3 +1,352 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from vehicle_management import replicas, warmup
+
+from . import autocomplete, homepage, saved_searches, similarity
+from .models import Gallery, SavedSearch, Vehicle, VehicleImage, parse_mileage
+
+User = get_user_model()
+
+LOCMEM_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'shared', 'throttle')
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AdminChangelistQueryTests(TestCase):
+    """
+    Changelist pages run a fixed number of queries however many rows there are
+    """
+    ROWS = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password', role='admin')
+        sellers = User.objects.bulk_create(
+            User(username=f'seller{i}', email=f'seller{i}@example.com') for i in range(50)
+        )
+        vehicles = Vehicle.objects.bulk_create(
+            (
+                Vehicle(
+                    title=f'Vehicle {i}', year=2000 + i % 25, price=1000 + i, fuel_type='petrol',
+                    transmission='manual', mileage=f'{i} miles', body_type=('saloon', 'suv', 'estate')[i % 3],
+                    color='Black', engine='2.0L', description='Test vehicle', created_by=sellers[i % len(sellers)],
+                )
+                for i in range(cls.ROWS)
+            ),
+            batch_size=1000,
+        )
+        VehicleImage.objects.bulk_create(
+            (VehicleImage(vehicle=vehicle, image=f'vehicles/test_{vehicle.id}', is_primary=True) for vehicle in vehicles),
+            batch_size=1000,
+        )
+        Gallery.objects.bulk_create(
+            (
+                Gallery(title=f'Image {i}', image=f'gallery/test_{i}', uploaded_by=sellers[i % len(sellers)])
+                for i in range(cls.ROWS)
+            ),
+            batch_size=1000,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assertChangelistQueries(self, url, expected):
+        # First and last page, each with an uncached row count
+        for page in ('', f'?p={self.ROWS // 100}'):
+            cache.clear()
+            with self.subTest(page=page), self.assertNumQueries(expected):
+                response = self.client.get(url + page)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['cl'].result_list), 100)
+
+    # Session, user, COUNT(*) and the page with its related rows joined
+
+    def test_vehicle_changelist(self):
+        # Plus the distinct body types for the body_type filter
+        self.assertChangelistQueries('/admin/vehicles/vehicle/', 5)
+
+    def test_vehicle_image_changelist(self):
+        self.assertChangelistQueries('/admin/vehicles/vehicleimage/', 4)
+
+    def test_gallery_changelist(self):
+        self.assertChangelistQueries('/admin/vehicles/gallery/', 4)
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    """
+    Precomputed and scanned prefixes rank suggestions the same way
+    """
+
+    def test_matches_a_full_scan_for_every_prefix(self):
+        titles = [
+            f'{make} {model} {trim}'
+            for make, models in (('Toyota', ('Corolla', 'Camry', 'Yaris')), ('Tesla', ('Model 3', 'Model Y')))
+            for model in models
+            for trim in ('SE', 'GT', 'Icon', 'Design')
+            for _ in range(1 + len(model) % 3)
+        ]
+        with mock.patch.object(autocomplete, 'SCAN_LIMIT', 4):
+            index = autocomplete.AutocompleteIndex(titles)
+        self.assertIn('toyota c', index.top)
+        # Queries are normalized, so "toyota " looks up "toyota"
+        prefixes = {autocomplete.normalize(key[:length]) for key in index.keys for length in range(1, len(key) + 1)}
+        for prefix in prefixes:
+            matches = [i for i, key in enumerate(index.keys) if key.startswith(prefix)]
+            expected = [
+                {'text': index.labels[i], 'count': index.counts[i]} for i in sorted(matches, key=index._rank)[:10]
+            ]
+            with self.subTest(prefix=prefix):
+                self.assertEqual(index.suggest(prefix, 10), expected)
+                if prefix not in index.top:
+                    self.assertLessEqual(len(matches), 4)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class HomepageGalleryTests(TestCase):
+    def test_sample_is_distinct_active_images(self):
+        uploader = User.objects.create_user('uploader', 'uploader@example.com', 'password')
+        Gallery.objects.bulk_create(
+            Gallery(title=f'Image {i}', image=f'gallery/test_{i}', uploaded_by=uploader, is_active=i % 3 != 0)
+            for i in range(60)
+        )
+        sample = homepage.sample_gallery(12)
+        self.assertEqual(len(sample), 12)
+        self.assertEqual(len({image.id for image in sample}), 12)
+        self.assertTrue(all(image.is_active for image in sample))
+
+    def test_sample_of_an_empty_gallery(self):
+        self.assertEqual(homepage.sample_gallery(12), [])
+
+
+class ParseMileageTests(SimpleTestCase):
+    def test_miles(self):
+        self.assertEqual(parse_mileage('60,000 miles'), 60000)
+        self.assertEqual(parse_mileage('45k miles'), 45000)
+
+    def test_kilometres_are_converted_to_miles(self):
+        self.assertEqual(parse_mileage('45k km'), 27961)
+        self.assertEqual(parse_mileage('100km'), 62)
+        self.assertEqual(parse_mileage('16,000 kilometres'), 9941)
+
+    def test_unparsable_or_out_of_range(self):
+        self.assertIsNone(parse_mileage('unknown'))
+        self.assertIsNone(parse_mileage(''))
+        self.assertIsNone(parse_mileage('9999999999 miles'))
+        self.assertIsNone(parse_mileage('9,999,999k'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VehicleSaveTests(TestCase):
+    def test_out_of_range_mileage_saves_without_a_value(self):
+        seller = User.objects.create_user('seller', 'seller@example.com', 'password')
+        vehicle = Vehicle.objects.create(
+            title='High miler', year=2001, price=500, fuel_type='diesel', transmission='manual',
+            mileage='9999999999 miles', body_type='estate', color='Grey', engine='1.9L',
+            description='Test vehicle', created_by=seller,
+        )
+        vehicle.refresh_from_db()
+        self.assertIsNone(vehicle.mileage_value)
+
+
+class SimilarityIndexTests(SimpleTestCase):
+    def test_free_text_categories_do_not_wrap(self):
+        index = similarity.SimilarityIndex()
+        # 2 ** 16 distinct body types apart would share an int16 code
+        for vehicle_id in range(2 ** 16 + 2):
+            index._upsert(vehicle_id, 2015, 10000, 'petrol', 'manual', f'body {vehicle_id}')
+        index.built_at = time.monotonic()
+        distances = dict(index.similar(1, k=len(index.rows)))
+        self.assertEqual(distances[2 ** 16 + 1], similarity.BODY_TYPE_WEIGHT)
+
+    @override_settings(SIMILAR_VEHICLES_MAX_AGE=60)
+    def test_stale_index_rebuilds_off_the_request_thread(self):
+        index = similarity.SimilarityIndex()
+        index.built_at = time.monotonic() - 61
+        rebuilt = threading.Event()
+        with mock.patch.object(index, 'rebuild', side_effect=lambda: rebuilt.set()):
+            index.ensure_fresh()
+            self.assertTrue(rebuilt.wait(5))
+
+    def test_saves_during_a_rebuild_are_kept(self):
+        index = similarity.SimilarityIndex()
+        saved = Vehicle(id=7, year=2020, price=20000, fuel_type='electric', transmission='automatic',
+                        body_type='hatchback', is_active=True)
+
+        def load(*fields):
+            # The save lands after the rebuild's query has run
+            index.update(saved)
+            return []
+
+        with mock.patch.object(similarity.Vehicle.objects, 'filter') as queryset:
+            queryset.return_value.values_list.side_effect = load
+            index.rebuild()
+        self.assertIn(7, index)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SAVED_SEARCH_INDEX_MAX_AGE=60)
+class SavedSearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('searcher', 'searcher@example.com', 'password')
+        self.index = saved_searches.SavedSearchIndex()
+
+    def test_stale_index_reloads_off_the_request_thread(self):
+        self.index.rebuild()
+        self.index.built_at = time.monotonic() - 61
+        reloaded = threading.Event()
+        with mock.patch.object(self.index, 'rebuild', side_effect=lambda: reloaded.set()) as rebuild:
+            self.index.sync()
+            self.assertTrue(reloaded.wait(5))
+        rebuild.assert_called_once_with()
+
+    def test_rebuild_replaces_the_index(self):
+        search = SavedSearch.objects.create(user=self.user, params={'fuel_type': 'diesel'})
+        self.index.rebuild()
+        vehicle = Vehicle(fuel_type='diesel', body_type='estate', transmission='manual', price=5000, year=2015)
+        self.assertEqual(self.index.match(vehicle), [(search.id, self.user.id)])
+        SavedSearch.objects.filter(id=search.id).update(is_active=False)
+        self.index.rebuild()
+        self.assertEqual(self.index.match(vehicle), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, WARMUP_HOOKS=[])
+class WarmupTests(SimpleTestCase):
+    """
+    Nothing the master opens or schedules during warm-up crosses the fork
+    """
+
+    def test_master_closes_connection_pools(self):
+        closed = []
+        for alias in connections:
+            patcher = mock.patch.object(
+                connections[alias], 'close_pool', create=True, side_effect=lambda alias=alias: closed.append(alias)
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        warmup.warm_app()
+        self.assertCountEqual(closed, list(connections))
+
+    def test_homepage_warm_builds_in_the_foreground(self):
+        cache.clear()
+        homepage.schedule_rebuild(delay=60)
+        self.addCleanup(setattr, homepage, '_pending', None)
+        pending = homepage._pending
+        with mock.patch.object(homepage, 'build_feed') as build_feed:
+            homepage.warm()
+        build_feed.assert_called_once_with()
+        self.assertIsNone(homepage._pending)
+        self.assertTrue(pending.finished.is_set())  # Cancelled
+
+
+REPLICA = 'replica_test'
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_DATABASES=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Reads from the vehicles API go to the replica unless the client just wrote
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A second connection to the test database, standing in for a replica
+        connections.settings[REPLICA] = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        cls.addClassCleanup(connections.settings.pop, REPLICA)
+        cls.databases = cls.databases | {REPLICA}
+        cls.addClassCleanup(connections.close_all)
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user('seller', 'seller@example.com', 'password')
+        self.token = Token.objects.create(user=self.seller).key
+        self.vehicle = Vehicle.objects.create(
+            title='Routed', year=2018, price=9000, fuel_type='petrol', transmission='manual',
+            mileage='40,000 miles', body_type='saloon', color='Red', engine='1.6L',
+            description='Test vehicle', created_by=self.seller,
+        )
+        self.reads = []
+        db_for_read = replicas.PrimaryReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            if model is Vehicle:
+                self.reads.append(alias)
+            return alias
+
+        patcher = mock.patch.object(replicas.PrimaryReplicaRouter, 'db_for_read', record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_aliases(self, client, path, **headers):
+        self.reads.clear()
+        response = client.get(path, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(replicas._use_replica.get())
+        return set(self.reads)
+
+    def detail(self):
+        return f'/api/v1/vehicles/{self.vehicle.id}/'
+
+    def update(self, client, status, **data):
+        response = client.patch(self.detail(), data, content_type='application/json',
+                                HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.read_aliases(self.client, self.detail()), {REPLICA})
+
+    def test_writes_go_to_the_primary(self):
+        writes = []
+        db_for_write = replicas.PrimaryReplicaRouter.db_for_write
+
+        def record(router, model, **hints):
+            writes.append(db_for_write(router, model, **hints))
+            return writes[-1]
+
+        with mock.patch.object(replicas.PrimaryReplicaRouter, 'db_for_write', record):
+            self.update(self.client, 200, color='Blue')
+        self.assertEqual(set(writes), {'default'})
+        self.vehicle.refresh_from_db(using=REPLICA)
+        self.assertEqual(self.vehicle.color, 'Blue')
+
+    def test_cookie_pins_the_client_after_a_write(self):
+        response = self.update(self.client, 200, color='Blue')
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.read_aliases(self.client, self.detail()), {'default'})
+
+    def test_cache_pins_the_token_on_other_workers(self):
+        self.update(self.client, 200, color='Blue')
+        # A client without the cookie, as on another worker, still holds the token
+        other = self.client_class()
+        self.assertEqual(
+            self.read_aliases(other, self.detail(), HTTP_AUTHORIZATION=f'Token {self.token}'), {'default'}
+        )
+        self.assertEqual(self.read_aliases(self.client_class(), self.detail()), {REPLICA})
+
+    def test_rejected_writes_do_not_pin(self):
+        response = self.update(self.client, 400, year='not a year')
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.read_aliases(self.client, self.detail()), {REPLICA})
+
+    def test_logins_do_not_pin(self):
+        response = self.client.post('/api/v1/auth/token/', {'username': 'seller', 'password': 'password'})
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_async_views_read_from_the_replica_and_reset_the_flag(self):
+        self.assertEqual(self.read_aliases(self.client, f'/api/v1/async/vehicles/{self.vehicle.id}/'), {REPLICA})
+
+    async def test_async_client_resets_the_flag(self):
+        response = await self.async_client.get(f'/api/v1/async/vehicles/{self.vehicle.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(replicas._use_replica.get())
+        self.assertIn(REPLICA, self.reads)
@@ -7,13 +7,25 @@ urlpatterns = [
     # Vehicle CRUD operations
     path('', views.VehicleListCreateView.as_view(), name='vehicle-list-create'),
     path('<int:pk>/', views.VehicleDetailView.as_view(), name='vehicle-detail'),
-    
+    path('<int:pk>/similar/', views.similar_vehicles, name='vehicle-similar'),
+    path('autocomplete/', views.vehicle_autocomplete, name='vehicle-autocomplete'),
+    path('batch/', views.vehicle_batch, name='vehicle-batch'),
+    path('bulk/', views.bulk_update_vehicles, name='vehicle-bulk-update'),
+    path('changes/', views.vehicle_changes, name='vehicle-changes'),
+    path('home/', views.homepage_feed, name='homepage-feed'),
+    path('saved-searches/', views.SavedSearchListCreateView.as_view(), name='saved-search-list-create'),
+    path('saved-searches/<int:pk>/', views.SavedSearchDetailView.as_view(), name='saved-search-detail'),
+    path('saved-searches/alerts/', views.SearchAlertListView.as_view(), name='search-alerts'),
+
     # Gallery (standalone images, not attached to vehicles)
     path('gallery/', views.GalleryView.as_view(), name='gallery'),
+    path('gallery/upload/', views.gallery_image_upload, name='gallery-upload'),
     path('gallery/<int:pk>/', views.GalleryDetailView.as_view(), name='gallery-detail'),
     
     # Vehicle images
     path('<int:vehicle_id>/images/', views.VehicleImageView.as_view(), name='vehicle-images'),
+    path('<int:vehicle_id>/images/upload/', views.vehicle_image_upload, name='vehicle-image-upload'),
+    path('uploads/confirm/', views.confirm_upload, name='confirm-upload'),
     path('<int:vehicle_id>/images/<int:image_id>/delete/', views.delete_vehicle_image, name='delete-vehicle-image'),
     
     # Statistics
@@ -1,22 +1,99 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
-from .models import Vehicle, VehicleImage, Gallery
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from .models import Vehicle, VehicleImage, Gallery, SavedSearch, SearchAlert, parse_mileage
 from .serializers import (
     VehicleSerializer, VehicleListSerializer, VehicleImageSerializer,
-    GallerySerializer
+    GallerySerializer, VehicleBulkUpdateSerializer, DirectUploadSerializer,
+    DirectUploadConfirmSerializer, SavedSearchSerializer, SearchAlertSerializer
 )
+from .signals import vehicles_bulk_updated
+from .pagination import EstimatedCountPagination
 from .permissions import IsAuthenticatedOrReadOnly, IsOwnerOrAuthenticated
+from . import autocomplete, changes, direct_upload, homepage, listing_snapshot, similarity
 import random
 
+# ?ordering= values for the vehicle list. Each one has a partial index on
+# (field, id) WHERE is_active, and the id tiebreak keeps pages stable.
+VEHICLE_ORDERINGS = {
+    '-created_at': ('-created_at', '-id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    '-year': ('-year', '-id'),
+    'mileage': (F('mileage_value').asc(nulls_last=True), 'id'),
+}
+DEFAULT_VEHICLE_ORDERING = '-created_at'
+
+def vehicle_ordering(params):
+    """
+    The requested ordering if whitelisted, else the default (newest first)
+    """
+    ordering = params.get('ordering')
+    return ordering if ordering in VEHICLE_ORDERINGS else DEFAULT_VEHICLE_ORDERING
+
+def filter_vehicles(queryset, params):
+    """
+    Apply the vehicle list search and filter query parameters to a queryset
+    """
+    # Add search functionality
+    search = params.get('search', None)
+    if search:
+        queryset = queryset.filter(
+            Q(title__icontains=search) |
+            Q(description__icontains=search) |
+            Q(color__icontains=search) |
+            Q(fuel_type__icontains=search) |
+            Q(body_type__icontains=search)
+        )
+    
+    # Add filtering
+    fuel_type = params.get('fuel_type', None)
+    if fuel_type:
+        queryset = queryset.filter(fuel_type=fuel_type)
+    
+    body_type = params.get('body_type', None)
+    if body_type:
+        queryset = queryset.filter(body_type=body_type)
+    
+    transmission = params.get('transmission', None)
+    if transmission:
+        queryset = queryset.filter(transmission=transmission)
+    
+    # Price range filtering
+    min_price = params.get('min_price', None)
+    if min_price:
+        queryset = queryset.filter(price__gte=min_price)
+    
+    max_price = params.get('max_price', None)
+    if max_price:
+        queryset = queryset.filter(price__lte=max_price)
+    
+    # Year range filtering
+    min_year = params.get('min_year', None)
+    if min_year:
+        queryset = queryset.filter(year__gte=min_year)
+    
+    max_year = params.get('max_year', None)
+    if max_year:
+        queryset = queryset.filter(year__lte=max_year)
+    
+    return queryset.order_by(*VEHICLE_ORDERINGS[vehicle_ordering(params)])
+
 class VehicleListCreateView(generics.ListCreateAPIView):
     """
     List all vehicles or create a new vehicle
     """
     queryset = Vehicle.objects.filter(is_active=True)
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = EstimatedCountPagination
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -24,51 +101,15 @@ class VehicleListCreateView(generics.ListCreateAPIView):
         return VehicleSerializer
     
     def get_queryset(self):
-        queryset = Vehicle.objects.filter(is_active=True)
-        
-        # Add search functionality
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(color__icontains=search) |
-                Q(fuel_type__icontains=search) |
-                Q(body_type__icontains=search)
-            )
-        
-        # Add filtering
-        fuel_type = self.request.query_params.get('fuel_type', None)
-        if fuel_type:
-            queryset = queryset.filter(fuel_type=fuel_type)
-        
-        body_type = self.request.query_params.get('body_type', None)
-        if body_type:
-            queryset = queryset.filter(body_type=body_type)
-        
-        transmission = self.request.query_params.get('transmission', None)
-        if transmission:
-            queryset = queryset.filter(transmission=transmission)
-        
-        # Price range filtering
-        min_price = self.request.query_params.get('min_price', None)
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        
-        max_price = self.request.query_params.get('max_price', None)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        # Year range filtering
-        min_year = self.request.query_params.get('min_year', None)
-        if min_year:
-            queryset = queryset.filter(year__gte=min_year)
-        
-        max_year = self.request.query_params.get('max_year', None)
-        if max_year:
-            queryset = queryset.filter(year__lte=max_year)
-        
-        return queryset.order_by('-created_at')
+        queryset = Vehicle.objects.filter(is_active=True).select_related('created_by').prefetch_related('images')
+        if self.request.method == 'GET' and settings.LISTING_SNAPSHOT_ENABLED:
+            # Resolve filter + sort from the shared snapshot; fetch only the page's rows
+            snapshot = listing_snapshot.current_snapshot()
+            params = self.request.query_params
+            ids = snapshot.resolve(params, vehicle_ordering(params)) if snapshot else None
+            if ids is not None:
+                return listing_snapshot.SnapshotResult(ids, queryset)
+        return filter_vehicles(queryset, self.request.query_params)
 
 class VehicleDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -85,6 +126,155 @@ class VehicleDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.save()
         return Response({'message': 'Vehicle deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def similar_vehicles(request, pk):
+    """
+    List the active vehicles most similar to this one, nearest first
+    """
+    index = similarity.index
+    index.ensure_fresh()
+    if pk not in index:
+        # Possibly created by another worker since the last rebuild
+        index.update(get_object_or_404(Vehicle, pk=pk, is_active=True))
+
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 6)), 20))
+    except ValueError:
+        limit = 6
+
+    ids = [vehicle_id for vehicle_id, _ in index.similar(pk, limit)]
+    vehicles = Vehicle.objects.filter(is_active=True).select_related('created_by').prefetch_related('images').in_bulk(ids)
+    results = [vehicles[vehicle_id] for vehicle_id in ids if vehicle_id in vehicles]
+
+    return Response({
+        'vehicle_id': pk,
+        'results': VehicleListSerializer(results, many=True, context={'request': request}).data,
+    })
+
+@api_view(['PATCH'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_update_vehicles(request):
+    """
+    Apply the same changes (e.g. price or is_active) to many of the caller's vehicles
+    """
+    serializer = VehicleBulkUpdateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(dict.fromkeys(serializer.validated_data['ids']))
+    changes = dict(serializer.validated_data['changes'])
+
+    # Model.save() is bypassed, so derive what it would have set
+    if 'mileage' in changes:
+        changes['mileage_value'] = parse_mileage(changes['mileage'])
+    changes['updated_at'] = timezone.now()
+
+    with transaction.atomic():
+        # Ownership check and row locks in one query
+        vehicles = Vehicle.objects.select_for_update().in_bulk(ids)
+        owned = [vehicle for vehicle in vehicles.values() if vehicle.created_by_id == request.user.id]
+        for vehicle in owned:
+            for field, value in changes.items():
+                setattr(vehicle, field, value)
+        if owned:
+            Vehicle.objects.bulk_update(owned, list(changes))
+            vehicles_bulk_updated(owned)
+
+    results = []
+    for vehicle_id in ids:
+        if vehicle_id not in vehicles:
+            results.append({'id': vehicle_id, 'status': 'not_found'})
+        elif vehicles[vehicle_id].created_by_id != request.user.id:
+            results.append({'id': vehicle_id, 'status': 'forbidden'})
+        else:
+            results.append({'id': vehicle_id, 'status': 'updated'})
+
+    return Response({'updated': len(owned), 'results': results})
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def vehicle_changes(request):
+    """
+    Vehicles created, updated or soft-deleted since a cursor, oldest change first
+    """
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 100)), 500))
+    except ValueError:
+        limit = 100
+
+    try:
+        vehicles, has_more = changes.changes_since(request.query_params.get('since'), limit)
+    except changes.InvalidCursor as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    except changes.ExpiredCursor as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_410_GONE)
+
+    context = {'request': request}
+    results = []
+    for vehicle in vehicles:
+        if vehicle.is_active:
+            results.append({'id': vehicle.id, 'deleted': False, 'vehicle': VehicleSerializer(vehicle, context=context).data})
+        else:
+            # Tombstone: the client should drop its copy
+            results.append({'id': vehicle.id, 'deleted': True, 'vehicle': None})
+
+    if vehicles:
+        next_cursor = changes.encode_cursor(vehicles[-1].updated_at, vehicles[-1].id)
+    else:
+        next_cursor = request.query_params.get('since')
+
+    return Response({
+        'results': results,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    })
+
+MAX_BATCH_IDS = 50
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def vehicle_batch(request):
+    """
+    Full details for several vehicles at once, in the order requested
+    """
+    raw_ids = ','.join(request.query_params.getlist('ids'))
+    try:
+        requested = [int(value) for value in raw_ids.split(',') if value.strip()]
+    except ValueError:
+        return Response({'error': 'ids must be a comma-separated list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if not requested:
+        return Response({'error': 'ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    ids = list(dict.fromkeys(requested))  # Drop duplicates, keep the first position
+    if len(ids) > MAX_BATCH_IDS:
+        return Response({'error': f'At most {MAX_BATCH_IDS} ids per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # One query for the vehicles and owners, one for all their images
+    vehicles = Vehicle.objects.select_related('created_by').prefetch_related('images').in_bulk(ids)
+    results = [vehicles[vehicle_id] for vehicle_id in ids if vehicle_id in vehicles and vehicles[vehicle_id].is_active]
+
+    return Response({
+        'results': VehicleSerializer(results, many=True, context={'request': request}).data,
+        'missing': [vehicle_id for vehicle_id in ids if vehicle_id not in vehicles],
+        'inactive': [vehicle_id for vehicle_id in ids if vehicle_id in vehicles and not vehicles[vehicle_id].is_active],
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def vehicle_autocomplete(request):
+    """
+    Suggest listing titles (make, model, trim) for a search-box prefix
+    """
+    query = request.query_params.get('q', '')
+    try:
+        limit = max(1, int(request.query_params.get('limit', 10)))
+    except ValueError:
+        limit = 10
+
+    return Response({
+        'query': query,
+        'suggestions': autocomplete.suggest(query, limit),
+    })
+
 class GalleryView(generics.ListCreateAPIView):
     """
     Gallery view for standalone images (not attached to vehicles)
@@ -93,6 +283,9 @@ class GalleryView(generics.ListCreateAPIView):
     """
     serializer_class = GallerySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = EstimatedCountPagination
+    # Every list loads the whole gallery to shuffle it
+    always_expensive = True
 
     def get_permissions(self):
         if self.request.method in permissions.SAFE_METHODS:
@@ -151,6 +344,69 @@ def delete_vehicle_image(request, vehicle_id, image_id):
     except VehicleImage.DoesNotExist:
         return Response({'error': 'Image not found'}, status=status.HTTP_404_NOT_FOUND)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def vehicle_image_upload(request, vehicle_id):
+    """
+    Signed fields for uploading a vehicle image straight to storage
+    """
+    vehicle = get_object_or_404(Vehicle, id=vehicle_id)
+    if vehicle.created_by != request.user and not request.user.is_admin:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    serializer = DirectUploadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    upload = direct_upload.issue_upload(request.user, vehicle, serializer.validated_data['is_primary'])
+    return Response(upload, status=status.HTTP_201_CREATED)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def gallery_image_upload(request):
+    """
+    Signed fields for uploading a gallery image straight to storage
+    """
+    return Response(direct_upload.issue_upload(request.user), status=status.HTTP_201_CREATED)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def confirm_upload(request):
+    """
+    Record a direct upload as a vehicle or gallery image once storage's signature checks out
+    """
+    serializer = DirectUploadConfirmSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    
+    try:
+        slot = direct_upload.verify_upload(
+            request.user, data['upload_token'], data['public_id'], data['version'], data['signature']
+        )
+    except direct_upload.ExpiredUpload as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_410_GONE)
+    except direct_upload.InvalidUpload as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    image = direct_upload.stored_image(data['public_id'], data['version'], data['format'])
+    # Confirming the same upload twice returns the row created the first time
+    if slot['vehicle'] is not None:
+        vehicle = get_object_or_404(Vehicle, id=slot['vehicle'])
+        existing = VehicleImage.objects.filter(vehicle=vehicle, image=image).first()
+        if existing:
+            return Response(VehicleImageSerializer(existing).data)
+        vehicle_image = VehicleImage.objects.create(vehicle=vehicle, image=image, is_primary=slot['is_primary'])
+        return Response(VehicleImageSerializer(vehicle_image).data, status=status.HTTP_201_CREATED)
+    
+    existing = Gallery.objects.filter(uploaded_by=request.user, image=image).first()
+    if existing:
+        return Response(GallerySerializer(existing).data)
+    gallery_image = Gallery.objects.create(
+        uploaded_by=request.user,
+        image=image,
+        title=data.get('title'),
+        description=data.get('description'),
+    )
+    return Response(GallerySerializer(gallery_image).data, status=status.HTTP_201_CREATED)
+
 class GalleryDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a gallery image (admin only)
@@ -186,3 +442,68 @@ def vehicle_stats(request):
         'total_vehicle_images': total_vehicle_images,
         'total_gallery_images': total_gallery_images,
     })
+
+@require_GET
+def homepage_feed(request):
+    """
+    Latest and featured listings, a gallery sample and stats, served as
+    precomputed JSON (see vehicles.homepage)
+    """
+    feed = homepage.get_feed()
+    if request.headers.get('If-None-Match') == feed['etag']:
+        response = HttpResponseNotModified()
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(feed['gzip'], content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(feed['body'], content_type='application/json')
+    response['ETag'] = feed['etag']
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = f'public, max-age={settings.HOMEPAGE_MAX_AGE}'
+    return response
+
+class SavedSearchListCreateView(generics.ListCreateAPIView):
+    """
+    List or save the caller's searches; new matching listings raise alerts
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user, is_active=True)
+    
+    def perform_create(self, serializer):
+        if self.get_queryset().count() >= settings.SAVED_SEARCHES_PER_USER:
+            raise ValidationError(f"You can save at most {settings.SAVED_SEARCHES_PER_USER} searches.")
+        serializer.save(user=self.request.user)
+
+class SavedSearchDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Retrieve, update or delete one of the caller's saved searches
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user, is_active=True)
+    
+    def perform_destroy(self, instance):
+        # Soft delete so matchers in other workers see the change
+        instance.is_active = False
+        instance.save(update_fields=['is_active', 'updated_at'])
+
+class SearchAlertListView(generics.ListAPIView):
+    """
+    New listings that matched the caller's saved searches, newest first
+    """
+    serializer_class = SearchAlertSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return (
+            SearchAlert.objects.filter(user=self.request.user)
+            .select_related('saved_search', 'vehicle__created_by')
+            .prefetch_related('vehicle__images')
+            .order_by('-created_at')
+        )
+